@@ -1,9 +1,11 @@
 import requests
+import http_client
 import json
 import os
 import sys
 import importlib.util
 from image_handler import ImageHandler
+from content_filter import enforce_token_budget
 
 def load_instructions():
     """
@@ -177,7 +179,7 @@ class APIHandler:
         
         try:
             # Make API call
-            response = requests.post(
+            response = http_client.post(
                 api_url, 
                 headers=headers, 
                 json=payload,
@@ -289,6 +291,8 @@ class APIHandler:
         if not base_content and not images:
             raise ValueError("No content provided")
         
+        # Trim low-priority sections up front rather than failing after a long wait on context size
+        base_content = enforce_token_budget(base_content, config)
         content_text, instructions = APIHandler.build_content(base_content, additional_instructions)
         
         print(f"Sending request to {provider.title()}...")
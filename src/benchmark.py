@@ -0,0 +1,367 @@
+"""
+Benchmarks for the scraper's HTML cleaning pipeline and browser profiles.
+
+    python benchmark.py markdown [page.html ...]
+    python benchmark.py prune [page.html ...]
+    python benchmark.py parsers [page.html ...]
+    python benchmark.py profiles URL [URL ...]
+    python benchmark.py extraction URL [URL ...]
+
+Without files, a synthetic corpus of deep wiki-like pages is generated.
+'profiles' loads live URLs with the full and text-only Selenium profiles.
+'extraction' compares page_source and in-browser extraction on live URLs.
+"""
+import re
+import sys
+import time
+from bs4 import BeautifulSoup, NavigableString, Tag, Comment
+from html_cleaner import node_to_markdown, extract_main_content, clean_and_format_text, is_parser_available, HTML_PARSER
+
+
+def legacy_to_markdown(node, list_depth=0):
+    """Reference copy of the original recursive converter, kept for output comparison."""
+    if isinstance(node, NavigableString):
+        text = str(node)
+        return re.sub(r'\s+', ' ', text)
+
+    if not isinstance(node, Tag):
+        return ""
+
+    tag = node.name
+    children_md = "".join(legacy_to_markdown(c, list_depth) for c in node.children)
+
+    # Block Elements
+    if tag in['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+        level = tag[1]
+        return f"\n\n{'#' * int(level)} {children_md.strip()}\n\n"
+
+    elif tag == 'p':
+        return f"\n\n{children_md.strip()}\n\n"
+
+    elif tag in ['ul', 'ol']:
+        return f"\n{children_md}\n"
+
+    elif tag == 'li':
+        indent = "  " * list_depth
+        prefix = "- " if node.parent and node.parent.name == 'ul' else "1. "
+        inner = "".join(legacy_to_markdown(c, list_depth + 1) for c in node.children).strip()
+        return f"\n{indent}{prefix}{inner}"
+
+    elif tag == 'blockquote':
+        return "\n\n" + "\n".join(f"> {line}" for line in children_md.strip().split("\n")) + "\n\n"
+
+    elif tag in ['pre', 'code']:
+        if tag == 'code' and node.parent.name != 'pre':
+            return f"`{children_md.strip()}`"
+        text = node.get_text()
+        return f"\n\n```\n{text}\n```\n\n"
+
+    # ATUALIZAÇÃO: Lógica de Tabelas (GitHub Flavored Markdown) aprimorada
+    elif tag == 'table':
+        # Se for uma tabela DENTRO de outra tabela, o Markdown quebra. 
+        # Então nós a tratamos apenas como texto plano.
+        if node.find_parent('table'):
+            return f" {children_md.strip()} "
+
+        # Pega apenas as linhas que pertencem DIRETAMENTE a esta tabela (ignora tabelas filhas)
+        rows =[]
+        for child in node.children:
+            if child.name in ['thead', 'tbody', 'tfoot']:
+                rows.extend(child.find_all('tr', recursive=False))
+            elif child.name == 'tr':
+                rows.append(child)
+
+        if not rows: return ""
+
+        table_md = "\n\n"
+        valid_rows = 0
+
+        for i, row in enumerate(rows):
+            # Pega apenas as células diretas (evita vazamento de tabelas aninhadas)
+            cells = row.find_all(['td', 'th'], recursive=False)
+            if not cells: continue
+
+            # O Markdown NÃO permite quebras de linha dentro de uma célula da tabela
+            # O strip() e split() transformam quebras de linha em espaços
+            cell_text =[" ".join(legacy_to_markdown(c).strip().split()) for c in cells]
+            table_md += "| " + " | ".join(cell_text) + " |\n"
+
+            # Adiciona a linha de separação após a primeira linha
+            if valid_rows == 0:
+                table_md += "| " + " | ".join(["---"] * len(cells)) + " |\n"
+
+            valid_rows += 1
+
+        return table_md + "\n"
+
+    # Inline Elements
+    elif tag in ['strong', 'b']:
+        return f" **{children_md.strip()}** "
+
+    elif tag in ['em', 'i']:
+        return f" *{children_md.strip()}* "
+
+    elif tag == 'a':
+        href = node.get('href', '')
+        text = children_md.strip()
+        if not text: return ""
+        if href.startswith('http'):
+            return f" [{text}]({href}) "
+        return f" [{text}] "
+
+    elif tag in ['br', 'hr']:
+        return "\n" if tag == 'br' else "\n\n---\n\n"
+
+    else:
+        return children_md
+
+
+def legacy_extract_main_content(soup):
+    """Reference copy of the original per-selector pruning and find_all('p') scoring."""
+    # 1. Clean out completely irrelevant DOM elements
+    for element in soup(['script', 'style', 'noscript', 'meta', 'link', 'iframe', 'svg', 
+                         'canvas', 'form', 'nav', 'footer', 'aside', 'header', 'button', 'input']):
+        element.decompose()
+
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    # ATUALIZAÇÃO: Adicionado filtros agressivos para caixas de navegação de Wikis
+    for selector in[
+        ".comment", "#comments", ".advertisement", ".sidebar", ".menu", ".cookie-banner",
+        ".navbox", ".infobox", ".metadata", ".toc", "#toc",
+        "table[class*='navbox']", "div[class*='navbox']", "table[class*='infobox']"
+    ]:
+        for el in soup.select(selector):
+            el.decompose()
+
+    # 2. Heuristic Content Detection
+    main_content = None
+    for selector in ['article', 'main', '[role="main"]', '#main-content', '.main-content']:
+        main_content = soup.select_one(selector)
+        if main_content: break
+
+    if not main_content:
+        candidates = soup.find_all(['div', 'section'])
+        best_candidate = soup.body if soup.body else soup
+        highest_score = -1
+
+        for candidate in candidates:
+            p_tags = candidate.find_all('p')
+            score = len(p_tags)
+            class_id_text = (candidate.get('class', [''])[0] + " " + candidate.get('id', '')).lower()
+            if any(bad in class_id_text for bad in['wrap', 'page', 'container', 'body']):
+                score -= 2
+
+            if score > highest_score and score > 2:
+                highest_score = score
+                best_candidate = candidate
+
+        main_content = best_candidate
+    return main_content
+
+
+def synthetic_corpus():
+    """Wiki-like pages with long prose, nested lists, nested tables and deep div wrappers."""
+    paragraph = "<p>Saber is a <b>Servant</b> of the <a href='https://example.org/sword'>Saber</a> class, <i>summoned</i> in the Fourth Holy Grail War.</p>"
+    nested_list = "<ul>" + "<li>item<ul>" * 8 + "<li>leaf</li>" + "</ul></li>" * 8 + "</ul>"
+    table = "<table><tr><th>Stat</th><th>Rank</th></tr>" + "".join(
+        f"<tr><td>Stat {i}</td><td><table><tr><td>A+</td></tr></table><ul><li>note</li></ul></td></tr>" for i in range(40)
+    ) + "</table>"
+    pages = {
+        "prose": "<html><body><article>" + paragraph * 2000 + "</article></body></html>",
+        "lists-and-tables": "<html><body><article>" + (paragraph * 20 + nested_list + table) * 20 + "</article></body></html>",
+        "deep-divs": "<html><body><article>" + "<div>" * 250 + paragraph * 200 + "</div>" * 250 + "</article></body></html>",
+        "fandom-like": "<html><body><div class='page'>" + (
+            "<div class='wrapper'><aside class='portable-infobox'>Age: 15</aside><div class='section'>" + paragraph * 10
+            + "<table class='navbox'><tr><td>nav</td></tr></table><script>var x = 1;</script><!-- ad slot -->"
+        ) * 60 + "</div></div>" * 60 + "</div></body></html>",
+        "very-deep": "<html><body><article>" + "<div><span>" * 1500 + "deep text" + "</span></div>" * 1500 + "</article></body></html>",
+    }
+    return list(pages.items())
+
+
+def load_corpus(paths):
+    corpus = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            corpus.append((path, f.read()))
+    return corpus
+
+
+def _time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except RecursionError:
+            return None, "RecursionError"
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_markdown(corpus, repeat=3):
+    """Compares the iterative converter with the original recursive one: output and speed."""
+    print(f"{'page':<28} {'recursive':>12} {'iterative':>12} {'speedup':>9}  output")
+    mismatches = 0
+    for name, html in corpus:
+        soup = BeautifulSoup(html, 'html.parser')
+        root = soup.body or soup
+        old_time, old_md = _time(lambda: legacy_to_markdown(root), repeat)
+        new_time, new_md = _time(lambda: node_to_markdown(root), repeat)
+
+        if old_time is None:
+            status, old_col, speedup = "recursive version hit the recursion limit", "   overflow", "-"
+        else:
+            same = old_md == new_md
+            mismatches += not same
+            status = "identical" if same else "DIFFERENT"
+            old_col = f"{old_time * 1000:10.1f}ms"
+            speedup = f"{old_time / new_time:8.1f}x"
+        print(f"{name[:28]:<28} {old_col:>12} {new_time * 1000:10.1f}ms {speedup:>9}  {status}")
+    return mismatches == 0
+
+
+def bench_prune(corpus, repeat=3):
+    """Compares single-pass pruning/scoring with the original per-selector version."""
+    print(f"{'page':<28} {'per-selector':>12} {'single-pass':>12} {'speedup':>9}  main content")
+    mismatches = 0
+    for name, html in corpus:
+        timings = []
+        picked = []
+        for extract in (legacy_extract_main_content, extract_main_content):
+            # Both functions mutate the tree, so every run gets a freshly parsed copy
+            soups = [BeautifulSoup(html, 'html.parser') for _ in range(repeat)]
+            best = None
+            for soup in soups:
+                start = time.perf_counter()
+                node = extract(soup)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+            picked.append(node_to_markdown(node))
+
+        same = picked[0] == picked[1]
+        mismatches += not same
+        print(f"{name[:28]:<28} {timings[0] * 1000:10.1f}ms {timings[1] * 1000:10.1f}ms "
+              f"{timings[0] / timings[1]:8.1f}x  {'identical' if same else 'DIFFERENT'}")
+    return mismatches == 0
+
+
+def bench_parsers(corpus, repeat=3):
+    """Pages per second for each installed tree builder (parse + clean), checked against html.parser."""
+    backends = [name for name in ('html.parser', 'lxml', 'html5lib') if is_parser_available(name)]
+    print(f"Active backend: {HTML_PARSER}")
+    print(f"{'backend':<12} {'pages/s':>9}  output vs html.parser")
+
+    reference = None
+    all_same = True
+    for backend in backends:
+        outputs = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs = [clean_and_format_text(BeautifulSoup(html, backend)) for _, html in corpus]
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference = outputs
+        differing = [name for (name, _), out, ref in zip(corpus, outputs, reference) if out != ref]
+        all_same = all_same and not differing
+        status = "identical" if not differing else "differs on: " + ", ".join(differing)
+        print(f"{backend:<12} {len(corpus) * repeat / elapsed:9.1f}  {status}")
+    return all_same
+
+
+def bench_profiles(urls, browser_name="Chrome"):
+    """Loads each URL with the full and the text-only browser profile and compares bytes, time and text."""
+    from browser_pool import launch_browser, _quit
+    from scraper import READINESS_DEFAULTS, wait_for_page_ready, collect_page_metrics
+    from html_cleaner import html_to_markdown
+
+    results = {}
+    for profile, text_only in (("full", False), ("text-only", True)):
+        driver = launch_browser(browser_name, text_only=text_only)
+        try:
+            for url in urls:
+                started = time.time()
+                driver.get(url)
+                wait_for_page_ready(driver, READINESS_DEFAULTS)
+                metrics = collect_page_metrics(driver, started)
+                text, _ = html_to_markdown(driver.page_source, use_cache=False)
+                metrics["chars"] = len(text or "")
+                results[(url, profile)] = metrics
+        finally:
+            _quit(driver)
+
+    print(f"{'profile':<10} {'KB':>8} {'requests':>9} {'seconds':>8} {'chars':>8}  url")
+    for url in urls:
+        for profile in ("full", "text-only"):
+            m = results[(url, profile)]
+            print(f"{profile:<10} {m['bytes'] / 1024:8.0f} {m['requests']:9d} {m['elapsed']:8.1f} {m['chars']:8d}  {url}")
+        full, fast = results[(url, "full")], results[(url, "text-only")]
+        saved = 1 - fast["bytes"] / full["bytes"] if full["bytes"] else 0
+        print(f"{'saved':<10} {saved:8.0%} {full['requests'] - fast['requests']:9d} "
+              f"{full['elapsed'] - fast['elapsed']:8.1f} {fast['chars'] - full['chars']:8d}")
+    return True
+
+
+_PAGE_SIZE_JS = "return new TextEncoder().encode(document.documentElement.outerHTML).length;"
+
+
+def bench_extraction(urls, browser_name="Chrome", repeat=3):
+    """
+    Loads each URL once, then extracts it repeatedly with page_source and in-browser
+    mode: bytes over the WebDriver wire, wall and Python CPU time (best run), and
+    whether both produce the same Markdown.
+    """
+    from browser_pool import launch_browser, _quit
+    from scraper import READINESS_DEFAULTS, EXTRACTION_MODES, wait_for_page_ready, extract_rendered_page
+
+    print(f"{'mode':<12} {'KB sent':>8} {'page KB':>8} {'seconds':>8} {'CPU s':>7} {'chars':>8}  url")
+    all_same = True
+    driver = launch_browser(browser_name)
+    try:
+        for url in urls:
+            driver.get(url)
+            wait_for_page_ready(driver, READINESS_DEFAULTS)
+            # Measured once, outside the timed runs: serializing the whole DOM is what in-browser mode avoids
+            page_bytes = driver.execute_script(_PAGE_SIZE_JS) or 0
+            outputs = {}
+            for mode in EXTRACTION_MODES:
+                best = None
+                for _ in range(repeat):
+                    text, _, _, stats = extract_rendered_page(driver, mode, use_cache=False)
+                    if best is None or stats["elapsed"] < best["elapsed"]:
+                        best = stats
+                outputs[mode] = text or ""
+                print(f"{mode:<12} {best['transferred'] / 1024:8.0f} {page_bytes / 1024:8.0f} "
+                      f"{best['elapsed']:8.2f} {best['cpu']:7.2f} {len(outputs[mode]):8d}  {url}")
+            same = outputs["page_source"] == outputs["in_browser"]
+            all_same = all_same and same
+            print(f"{'output':<12} {'identical' if same else 'DIFFERENT'}")
+    finally:
+        _quit(driver)
+    return all_same
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("markdown", "prune", "parsers", "profiles", "extraction"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] in ("profiles", "extraction"):
+        if len(sys.argv) < 3:
+            print(__doc__)
+            sys.exit(1)
+        bench = bench_profiles if sys.argv[1] == "profiles" else bench_extraction
+        sys.exit(0 if bench(sys.argv[2:]) else 1)
+
+    corpus = load_corpus(sys.argv[2:]) if len(sys.argv) > 2 else synthetic_corpus()
+    if sys.argv[1] == "markdown":
+        sys.exit(0 if bench_markdown(corpus) else 1)
+    if sys.argv[1] == "prune":
+        sys.exit(0 if bench_prune(corpus) else 1)
+    if sys.argv[1] == "parsers":
+        sys.exit(0 if bench_parsers(corpus) else 1)
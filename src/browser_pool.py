@@ -0,0 +1,288 @@
+import atexit
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.edge.options import Options as EdgeOptions
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
+
+try:
+    import config_manager
+except ImportError:
+    config_manager = None
+
+
+BROWSERS = [("Chrome", "chrome"), ("Edge", "edge"), ("Firefox", "firefox")]
+
+# "Text-only" profile: resources we never need for text extraction, blocked via CDP
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.css",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg",
+]
+DEFAULT_BLOCKED_DOMAINS = [
+    "doubleclick.net", "googlesyndication.com", "googletagmanager.com", "google-analytics.com",
+    "googletagservices.com", "adservice.google.com", "amazon-adsystem.com", "adthrive.com",
+    "scorecardresearch.com", "quantserve.com", "quantcount.com", "taboola.com", "outbrain.com",
+    "criteo.com", "criteo.net", "moatads.com", "pubmatic.com", "rubiconproject.com",
+    "nitropay.com", "btloader.com", "cookielaw.org", "onetrust.com", "hotjar.com",
+]
+
+
+def get_stealth_chrome_options(is_edge=False, text_only=False):
+    """Builds headless Chrome/Edge options with basic anti-automation fingerprint masking."""
+    options = EdgeOptions() if is_edge else ChromeOptions()
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
+    options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
+    options.add_experimental_option('useAutomationExtension', False)
+    # Ignore security errors to ensure page loads successfully
+    options.add_argument('--ignore-certificate-errors')
+    options.add_argument('--allow-running-insecure-content')
+    options.add_argument('--log-level=3')
+    options.add_argument('--silent')
+    if text_only:
+        # Return control at DOMContentLoaded and never fetch images or notifications
+        options.page_load_strategy = 'eager'
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2,
+            'profile.default_content_setting_values.media_stream': 2,
+        })
+    return options
+
+
+def get_firefox_options(text_only=False):
+    options = FirefoxOptions()
+    options.add_argument('--headless')
+    if text_only:
+        options.page_load_strategy = 'eager'
+        options.set_preference('permissions.default.image', 2)
+        options.set_preference('media.autoplay.default', 5)
+    return options
+
+
+def launch_browser(browser_name, text_only=False, blocked_domains=None):
+    """Starts a single headless browser by display name. Raises on failure."""
+    browser_type = dict(BROWSERS)[browser_name]
+    print(f"Setting up {browser_name} via Selenium 4 Auto-Manager{' (text-only profile)' if text_only else ''}...")
+
+    if browser_type == "chrome":
+        driver = webdriver.Chrome(options=get_stealth_chrome_options(is_edge=False, text_only=text_only))
+    elif browser_type == "edge":
+        driver = webdriver.Edge(options=get_stealth_chrome_options(is_edge=True, text_only=text_only))
+    else:
+        driver = webdriver.Firefox(options=get_firefox_options(text_only=text_only))
+
+    try:
+        # Apply anti-bot stealth scripts via CDP
+        if browser_type in ["chrome", "edge"]:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": """
+                    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+                    window.navigator.chrome = {runtime: {}};
+                    try { performance.setResourceTimingBufferSize(5000); } catch (e) {}
+                """
+            })
+            if text_only:
+                blocked = BLOCKED_RESOURCE_PATTERNS + [
+                    f"*{domain}*" for domain in (DEFAULT_BLOCKED_DOMAINS if blocked_domains is None else blocked_domains)
+                ]
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+        driver.set_page_load_timeout(45)
+    except Exception:
+        driver.quit()
+        raise
+
+    print(f"✓ {browser_name} initialized successfully.")
+    return driver
+
+
+def create_selenium_driver(preferred_browser="Chrome", config=None, text_only=False, blocked_domains=None):
+    """
+    Launches the first working browser, trying the preferred one first.
+    Returns (driver, browser_name) or (None, None) if every browser failed.
+    """
+    # Browsers to attempt, putting the config-preferred one first
+    browsers = sorted(BROWSERS, key=lambda x: x[0] != preferred_browser)
+
+    for browser_name, browser_type in browsers:
+        try:
+            driver = launch_browser(browser_name, text_only, blocked_domains)
+        except Exception:
+            # Silently fail and try the next browser
+            continue
+
+        # Save working browser to config
+        if config is not None and browser_name != preferred_browser and config_manager:
+            config["browser_config"] = {"browser_name": browser_name, "browser_type": browser_type}
+            config_manager.save_config(config)
+        return driver, browser_name
+
+    return None, None
+
+
+def is_driver_healthy(driver):
+    """Cheap liveness probe: the session must answer a trivial script call."""
+    try:
+        return driver.execute_script("return 1") == 1 and bool(driver.window_handles)
+    except Exception:
+        return False
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    """
+    Keeps initialized Selenium drivers alive between scraping jobs.
+
+    The browser probe (Chrome -> Edge -> Firefox) only runs once per process;
+    later launches go straight to the browser that worked. Drivers are health
+    checked when handed out and recycled after max_pages or when they crash.
+    With text_only, drivers use the resource-blocking fast load profile.
+    When no browser starts, launches are skipped for retry_after seconds, then probed again.
+    """
+
+    def __init__(self, max_idle=2, max_pages=50, idle_timeout=900, text_only=False, blocked_domains=None,
+                 retry_after=120):
+        self.text_only = text_only
+        self.blocked_domains = blocked_domains
+        self.max_idle = max_idle
+        self.max_pages = max_pages
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self.browser_name = None
+        self.failed_at = None
+        self._idle = []        # [(driver, idle_since)]
+        self._pages = {}       # id(driver) -> pages served
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+
+    @property
+    def all_failed(self):
+        """True while the last probe found no working browser and retry_after has not passed."""
+        return self.failed_at is not None and time.time() - self.failed_at < self.retry_after
+
+    def acquire(self, config=None):
+        """Returns a healthy driver (reused when possible) or None if no browser works."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                driver, idle_since = self._idle.pop()
+
+            if time.time() - idle_since > self.idle_timeout or not is_driver_healthy(driver):
+                self._discard(driver)
+                continue
+            return driver
+
+        return self._launch(config)
+
+    def release(self, driver, pages=0, broken=False):
+        """Hands a driver back. Crashed or worn-out drivers are quit instead of kept."""
+        if driver is None:
+            return
+        with self._lock:
+            served = self._pages.get(id(driver), 0) + pages
+            self._pages[id(driver)] = served
+            keep = not broken and served < self.max_pages and len(self._idle) < self.max_idle
+            if keep:
+                self._idle.append((driver, time.time()))
+                return
+        self._discard(driver)
+
+    def needs_recycle(self, driver, pages=0):
+        """True once a checked-out driver has served max_pages (counting pages not yet released)."""
+        with self._lock:
+            return self._pages.get(id(driver), 0) + pages >= self.max_pages
+
+    def shutdown(self):
+        """Quits every idle driver. Drivers still checked out are quit on release."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver, _ in idle:
+            self._discard(driver)
+
+    def reset(self):
+        """Forgets the cached browser choice so the next launch probes again."""
+        self.shutdown()
+        with self._probe_lock:
+            self.browser_name = None
+            self.failed_at = None
+
+    def _discard(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        _quit(driver)
+
+    def _launch(self, config):
+        # Once a browser is known to work, launch it directly without serializing workers
+        known = self.browser_name
+        if known:
+            try:
+                return launch_browser(known, self.text_only, self.blocked_domains)
+            except Exception:
+                print(f"⚠ Cached browser {known} failed to start. Probing again...")
+
+        with self._probe_lock:
+            if self.all_failed:
+                return None
+            if self.browser_name and self.browser_name != known:
+                # Another worker finished probing while we waited
+                try:
+                    return launch_browser(self.browser_name, self.text_only, self.blocked_domains)
+                except Exception:
+                    pass
+
+            config = config if config is not None else (config_manager.load_config() if config_manager else {})
+            preferred = config.get("browser_config", {}).get("browser_name") or "Chrome"
+            driver, browser_name = create_selenium_driver(preferred, config, self.text_only, self.blocked_domains)
+            if not driver:
+                self.failed_at = time.time()
+                return None
+
+            self.browser_name = browser_name
+            self.failed_at = None
+            return driver
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool(config=None):
+    """
+    Returns the process-wide BrowserPool for the configured profile ('selenium_text_only'),
+    creating it from config on first use.
+    """
+    config = config or {}
+    workers = max(1, int(config.get("selenium_workers", 1) or 1))
+    text_only = bool(config.get("selenium_text_only", False))
+    with _pool_lock:
+        pool = _pools.get(text_only)
+        if pool is None:
+            pool = BrowserPool(
+                max_idle=workers,
+                max_pages=config.get("browser_pool_max_pages", 50),
+                idle_timeout=config.get("browser_pool_idle_timeout", 900),
+                retry_after=config.get("browser_retry_after", 120),
+                text_only=text_only,
+                blocked_domains=config.get("text_only_blocked_domains"),
+            )
+            _pools[text_only] = pool
+            atexit.register(pool.shutdown)
+        # Keep enough warm drivers for the largest worker count seen so far
+        pool.max_idle = max(pool.max_idle, workers)
+        return pool
@@ -0,0 +1,329 @@
+import random
+import re
+import zlib
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+_encoding = None
+
+
+def count_tokens(text):
+    """cl100k_base token count, or a chars/4 estimate when tiktoken is unavailable."""
+    global _encoding
+    if not text:
+        return 0
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # The encoding file is downloaded on first use; estimate when offline
+            _encoding = False
+    if not _encoding:
+        return len(text) // 4
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+# --- Near-duplicate paragraph removal ---
+
+SHINGLE_SIZE = 5          # words per shingle
+MINHASH_BANDS = 8
+MINHASH_ROWS = 4          # 32 hash functions; candidates from ~0.6 Jaccard upwards
+MIN_SHINGLE_WORDS = 8     # shorter blocks are only matched exactly
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_HASH_PARAMS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+_BLOCK_SPLIT_RE = re.compile(r'\n\s*\n')
+_WORD_RE = re.compile(r'\w+')
+_HEADING_RE = re.compile(r'^(#{1,6})\s')
+_SOURCE_MARKER_RE = re.compile(r'^(---|--- Content from .* ---)$')
+
+
+def _shingles(words):
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def _minhash_bands(shingles):
+    signature = [min((a * s + b) % _MERSENNE_PRIME for s in shingles) for a, b in _HASH_PARAMS]
+    return [
+        (band, tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]))
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def dedupe_paragraphs(text, threshold=0.7):
+    """
+    Drops paragraphs that nearly duplicate an earlier one anywhere in the scraped text
+    (word-shingle MinHash with LSH banding, confirmed by exact Jaccard/containment).
+    The first occurrence is kept in place under its source heading; sub-headings left
+    with nothing under them are dropped too. Returns (text, report).
+    """
+    blocks = [block.strip() for block in _BLOCK_SPLIT_RE.split(text or "")]
+    seen_exact = set()
+    kept_shingles = []     # shingle sets of kept paragraphs
+    buckets = {}           # (band, band_hash) -> [index into kept_shingles]
+    output = []            # [block, is_heading, heading_level, section_had_removals]
+    removed = 0
+
+    for block in blocks:
+        if not block:
+            continue
+        heading = _HEADING_RE.match(block)
+        if heading or _SOURCE_MARKER_RE.match(block):
+            output.append([block, True, len(heading.group(1)) if heading else 0, False])
+            continue
+
+        words = _WORD_RE.findall(block.lower())
+        normalized = ' '.join(words)
+        duplicate = len(normalized) >= 20 and normalized in seen_exact
+
+        shingles = None
+        if not duplicate and len(words) >= MIN_SHINGLE_WORDS:
+            shingles = _shingles(words)
+            bands = _minhash_bands(shingles)
+            candidates = {index for key in bands for index in buckets.get(key, ())}
+            for index in candidates:
+                other = kept_shingles[index]
+                common = len(shingles & other)
+                if (common / len(shingles | other) >= threshold
+                        or common / len(shingles) >= threshold):
+                    duplicate = True
+                    break
+
+        if duplicate:
+            removed += 1
+            # Mark the enclosing section so an emptied sub-heading can be dropped
+            for item in reversed(output):
+                if item[1]:
+                    item[3] = True
+                    break
+            continue
+
+        seen_exact.add(normalized)
+        if shingles is not None:
+            for key in bands:
+                buckets.setdefault(key, []).append(len(kept_shingles))
+            kept_shingles.append(shingles)
+        output.append([block, False, 0, False])
+
+    # Drop sub-headings (## and deeper) whose whole section was removed as duplicate
+    result = []
+    for position, (block, is_heading, level, had_removals) in enumerate(output):
+        if is_heading and level >= 2 and had_removals:
+            following = next((item for item in output[position + 1:]
+                              if not item[1] or item[2] == 0 or item[2] <= level), None)
+            if following is None or following[1]:
+                continue
+        result.append(block)
+
+    deduped = '\n\n'.join(result)
+    if text and text.endswith('\n'):
+        deduped += '\n'
+    tokens_before = count_tokens(text)
+    tokens_after = count_tokens(deduped) if removed else tokens_before
+    return deduped, {
+        'paragraphs_removed': removed,
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'tokens_saved': tokens_before - tokens_after,
+    }
+
+
+def filter_scraped_content(text, config=None):
+    """Post-scrape cleanup applied before generation ('dedupe_content', 'dedupe_threshold')."""
+    config = config or {}
+    if not text or not config.get('dedupe_content', True):
+        return text
+
+    deduped, report = dedupe_paragraphs(text, threshold=config.get('dedupe_threshold', 0.7))
+    if report['paragraphs_removed']:
+        print(f"✓ Removed {report['paragraphs_removed']} near-duplicate paragraphs "
+              f"(~{report['tokens_saved']} tokens saved, {report['tokens_after']} left)")
+    return deduped
+
+
+# --- Token budget ---
+
+# Content token budgets, matched as substrings of "provider/model" (longest match wins).
+# They leave headroom for the instructions and the 4000-token completion.
+DEFAULT_CONTENT_BUDGET = 24000
+MODEL_CONTENT_BUDGETS = {
+    'groq/': 16000,
+    'gemini': 200000,
+    'claude': 120000,
+    'gpt-4o': 60000,
+    'gpt-4.1': 120000,
+    'gpt-5': 120000,
+    'deepseek': 48000,
+    'llama': 24000,
+    'mistral': 24000,
+    'qwen': 24000,
+}
+
+SECTION_PRIORITIES = [
+    # (score, heading keywords) - first match wins, so specific phrases come first
+    (-4, ('gallery', 'references', 'external links', 'see also', 'navigation', 'citations', 'sources',
+          'notes', 'merchandise', 'navbox', 'footnotes')),
+    (-3, ('trivia', 'appearances in', 'in other media', 'behind the scenes', 'production', 'reception',
+          'video games', 'episode', 'chapter', 'filmography', 'voice actor', 'cast')),
+    # Must precede the 'appearance' keyword below, which every 'appearances' heading contains
+    (-2, ('appearances',)),
+    (4, ('appearance', 'personality', 'background', 'biography', 'history', 'early life')),
+    (3, ('abilities', 'powers', 'skills', 'relationships', 'profile', 'overview', 'description',
+         'characteristics', 'traits', 'synopsis', 'story', 'plot', 'quotes')),
+]
+
+_NAME_SPLIT_RE = re.compile(r'\s+[|\-–—:]\s+')
+
+
+def get_content_budget(config):
+    """Content token budget for the configured provider/model ('content_token_budget' overrides)."""
+    if config.get('content_token_budget'):
+        return int(config['content_token_budget'])
+    provider = config.get('api_provider') or ''
+    model = (config.get('provider_models') or {}).get(provider) or config.get('model_name') or ''
+    target = f"{provider}/{model}".lower()
+    budgets = dict(MODEL_CONTENT_BUDGETS, **(config.get('content_token_budgets') or {}))
+    matches = [key for key in budgets if key.lower() in target]
+    return int(budgets[max(matches, key=len)]) if matches else DEFAULT_CONTENT_BUDGET
+
+
+def split_sections(text):
+    """Splits Markdown into sections: dicts with heading, level, source (page title) and body."""
+    sections = []
+    current = {'heading': '', 'level': 0, 'source': '', 'lines': []}
+    source = ''
+    for line in (text or '').split('\n'):
+        heading = _HEADING_RE.match(line)
+        if heading or line.startswith('--- Content from '):
+            sections.append(current)
+            level = len(heading.group(1)) if heading else 1
+            title = line[level:].strip() if heading else line.strip('- ').replace('Content from ', '')
+            if level == 1:
+                source = title
+            current = {'heading': line, 'level': level, 'source': source, 'title': title, 'lines': []}
+        else:
+            current['lines'].append(line)
+    sections.append(current)
+
+    for section in sections:
+        section['body'] = '\n'.join(section.pop('lines'))
+        section.setdefault('title', '')
+    return [s for s in sections if s['heading'] or s['body'].strip()]
+
+
+def guess_character_name(text):
+    """The character name as it appears in the first page title ('Naruto Uzumaki | Narutopedia | Fandom')."""
+    for section in split_sections(text):
+        if section['level'] == 1 and section['title']:
+            return _NAME_SPLIT_RE.split(section['title'])[0].strip()
+    return ''
+
+
+def score_section(section, name_words):
+    """Higher is more useful for building a character card."""
+    title = section['title'].lower()
+    if section['level'] == 1:
+        score = 4    # Lead text under the page title is usually the summary
+    else:
+        score = next((value for value, keywords in SECTION_PRIORITIES
+                      if any(keyword in title for keyword in keywords)), 0)
+
+    body = section['body'].lower()
+    if name_words and body:
+        mentions = sum(body.count(word) for word in name_words)
+        score += min(2.0, mentions * 1000 / max(len(body), 1))
+    # Link-heavy or list-only sections (indexes, navboxes) are rarely prose worth keeping
+    lines = [line for line in section['body'].split('\n') if line.strip()]
+    if lines and sum(line.lstrip().startswith(('-', '*', '|')) for line in lines) / len(lines) > 0.8:
+        score -= 1
+    return score
+
+
+def _truncate_to_tokens(body, limit):
+    """Keeps whole paragraphs from the top of body while they fit in limit tokens."""
+    kept, used = [], 0
+    for paragraph in _BLOCK_SPLIT_RE.split(body.strip()):
+        tokens = count_tokens(paragraph) + 1
+        if used + tokens > limit:
+            break
+        kept.append(paragraph)
+        used += tokens
+    return '\n\n'.join(kept)
+
+
+def fit_to_budget(text, budget, character_name=None):
+    """
+    Trims scraped Markdown to `budget` tokens by dropping (or, for the last one,
+    truncating) its lowest-priority sections. Page title headings always stay.
+    Returns (text, cuts) where cuts is a list of human-readable explanations.
+    """
+    total = count_tokens(text)
+    if not text or total <= budget:
+        return text, []
+
+    sections = split_sections(text)
+    name = character_name or guess_character_name(text)
+    name_words = [word for word in re.findall(r'\w+', name.lower()) if len(word) > 2]
+    for position, section in enumerate(sections):
+        section['tokens'] = count_tokens(f"{section['heading']}\n{section['body']}")
+        # Earlier sections win ties
+        section['score'] = score_section(section, name_words) - position * 0.001
+
+    cuts = []
+    excess = sum(s['tokens'] for s in sections) - budget
+    for section in sorted(sections, key=lambda s: s['score']):
+        if excess <= 0:
+            break
+        label = f"'{section['title'] or 'untitled'}' from {section['source'] or 'unknown page'}"
+        body_tokens = count_tokens(section['body'])
+        if section['level'] == 1 and not body_tokens:
+            continue
+        if body_tokens - excess > 200 and section['score'] > 0:
+            # A useful section that only needs trimming: keep its opening paragraphs
+            section['body'] = _truncate_to_tokens(section['body'], body_tokens - excess)
+            kept = count_tokens(section['body'])
+            cuts.append(f"truncated {label} ({body_tokens - kept} of {body_tokens} tokens, score {section['score']:.1f})")
+            excess -= body_tokens - kept
+        else:
+            cuts.append(f"dropped {label} ({section['tokens']} tokens, score {section['score']:.1f})")
+            section['dropped'] = True
+            excess -= section['tokens'] if section['level'] != 1 else body_tokens
+
+    parts = []
+    for section in sections:
+        if section.get('dropped'):
+            if section['level'] != 1:
+                continue
+            # Keep the page title so the model still knows which source the rest came from
+            parts.append(section['heading'] + '\n')
+            continue
+        parts.append(f"{section['heading']}\n{section['body']}" if section['heading'] else section['body'])
+    return '\n'.join(parts), cuts
+
+
+def enforce_token_budget(text, config):
+    """Applies fit_to_budget with the model's budget and prints what was cut ('content_budget_enabled')."""
+    if not text or not config.get('content_budget_enabled', True):
+        return text
+    budget = get_content_budget(config)
+    trimmed, cuts = fit_to_budget(text, budget, config.get('character_name'))
+    if cuts:
+        print(f"⚠ Scraped content exceeded the {budget}-token budget for this model. Trimmed:")
+        for cut in cuts:
+            print(f"  - {cut}")
+        print(f"  → {count_tokens(text)} → {count_tokens(trimmed)} tokens")
+    return trimmed
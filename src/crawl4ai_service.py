@@ -0,0 +1,327 @@
+import asyncio
+import atexit
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+
+CRAWL4AI_PROFILE_DIR = "./.crawl4ai_profile"
+
+PROFILES_FILE = "scraper_profiles.json"
+
+# Profile for self-hosted MediaWiki sites that no profile lists by domain
+WIKI_PROFILE = "mediawiki"
+
+# Used when scraper_profiles.json is missing or unreadable
+BUILTIN_PROFILES = {
+    "default": {"exclude": ["#onetrust-banner-sdk", "#onetrust-consent-sdk"], "ready": "true", "delay": 0.2, "max_wait": 10},
+    "profiles": {},
+}
+
+# Ready once the body text has stopped changing for 300ms and the profile condition holds,
+# or unconditionally after max_wait so a never-true condition can't fail the page
+_WAIT_FOR_TEMPLATE = """js:() => {{
+    const length = document.body ? document.body.innerText.length : 0;
+    const state = window.__c4aReady || (window.__c4aReady = {{length: -1, since: performance.now()}});
+    if (length !== state.length) {{ state.length = length; state.since = performance.now(); }}
+    if (performance.now() > {max_wait_ms}) return true;
+    const stable = document.readyState !== 'loading' && length > 0 && performance.now() - state.since > 300;
+    return stable && ({ready});
+}}"""
+
+
+def _profiles_path():
+    # Next to the executable when frozen, so the file can be edited without rebuilding
+    if getattr(sys, 'frozen', False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, PROFILES_FILE)
+
+
+def load_scraper_profiles(path=None):
+    """Loads the per-domain crawl4ai profiles, falling back to a minimal built-in set."""
+    path = path or _profiles_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if "default" in data:
+            data.setdefault("profiles", {})
+            return data
+        print(f"⚠ {PROFILES_FILE} has no 'default' profile. Using built-in defaults.")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"⚠ Could not read {PROFILES_FILE}: {e}. Using built-in defaults.")
+    return BUILTIN_PROFILES
+
+
+def resolve_profile(name, profiles):
+    """Flattens a profile over its 'extends' chain and the default profile (selectors accumulate)."""
+    chain = []
+    while name and name not in chain:
+        chain.append(name)
+        name = profiles["profiles"].get(name, {}).get("extends")
+
+    resolved = dict(profiles["default"])
+    resolved["name"] = chain[0] if chain else "default"
+    exclude = list(resolved.get("exclude", []))
+    for step in reversed(chain):
+        profile = profiles["profiles"].get(step, {})
+        exclude += profile.get("exclude", [])
+        resolved.update({k: v for k, v in profile.items() if k not in ("exclude", "domains", "extends")})
+    # Keep first occurrence order, drop duplicates inherited through several levels
+    resolved["exclude"] = list(dict.fromkeys(exclude))
+    return resolved
+
+
+def get_domain_profile(url, profiles=None):
+    """
+    The resolved profile whose domains best (longest suffix) match the URL's host. Wikis
+    on their own domains match none; they get the WIKI_PROFILE when the URL looks like a
+    MediaWiki article (see mediawiki.is_mediawiki_url), so the default stays generic.
+    """
+    profiles = profiles or load_scraper_profiles()
+    host = (urlparse(url).hostname or "").lower()
+    best, best_length = None, 0
+    for name, profile in profiles["profiles"].items():
+        for domain in profile.get("domains", []):
+            if (host == domain or host.endswith("." + domain)) and len(domain) > best_length:
+                best, best_length = name, len(domain)
+    if best is None and WIKI_PROFILE in profiles["profiles"]:
+        from mediawiki import is_mediawiki_url
+        if is_mediawiki_url(url):
+            best = WIKI_PROFILE
+    return resolve_profile(best, profiles)
+
+
+def build_wait_for(profile):
+    return _WAIT_FOR_TEMPLATE.format(
+        max_wait_ms=int(float(profile.get("max_wait", 10)) * 1000),
+        ready=profile.get("ready") or "true",
+    )
+
+
+def is_crawl4ai_available():
+    return importlib.util.find_spec("crawl4ai") is not None
+
+
+class Crawl4aiService:
+    """
+    Runs crawl4ai on a dedicated event-loop thread with one warm AsyncWebCrawler.
+
+    The browser starts on the first job and is reused by later ones (it is only
+    restarted when the headless setting changes or a whole job crashes). submit()
+    is thread-safe and works whether or not the caller has its own event loop.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._crawler = None
+        self._headless = None
+        self._lock = threading.Lock()
+        self._crawler_lock = None   # asyncio.Lock, created lazily on the service loop
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, name="crawl4ai-service", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _get_crawler(self, headless):
+        from crawl4ai import BrowserConfig, AsyncWebCrawler
+
+        if self._crawler_lock is None:
+            self._crawler_lock = asyncio.Lock()
+        async with self._crawler_lock:
+            if self._crawler is not None and self._headless != headless:
+                await self._close_crawler()
+            if self._crawler is None:
+                os.environ["NODE_OPTIONS"] = "--no-deprecation"
+                browser_config = BrowserConfig(
+                    headless=headless,
+                    verbose=False,
+                    use_persistent_context=True,
+                    user_data_dir=CRAWL4AI_PROFILE_DIR,
+                )
+                crawler = AsyncWebCrawler(config=browser_config)
+                await crawler.start()
+                self._crawler, self._headless = crawler, headless
+            return self._crawler
+
+    async def _close_crawler(self):
+        crawler, self._crawler = self._crawler, None
+        if crawler is not None:
+            try:
+                await crawler.close()
+            except Exception:
+                pass
+
+    async def _page_crawler(self, headless, concurrency):
+        """
+        Returns (crawl_one, errors): crawl_one(url) crawls a single page under a shared
+        concurrency limit and returns (page_title, markdown) or None; errors collects
+        the exceptions raised along the way.
+        """
+        from crawl4ai import CrawlerRunConfig, DefaultMarkdownGenerator
+
+        crawler = await self._get_crawler(headless)
+        profiles = load_scraper_profiles()
+        run_configs = {}
+
+        def _run_config(url):
+            # One CrawlerRunConfig per matched profile, so each site only runs its own selectors
+            profile = get_domain_profile(url, profiles)
+            if profile["name"] not in run_configs:
+                run_configs[profile["name"]] = CrawlerRunConfig(
+                    wait_for=build_wait_for(profile),
+                    delay_before_return_html=float(profile.get("delay", 0.2)),
+                    css_selector="body",
+                    excluded_selector=", ".join(profile["exclude"]),
+                    markdown_generator=DefaultMarkdownGenerator(
+                        options={"ignore_links": True, "skip_internal_links": True}
+                    )
+                )
+            return run_configs[profile["name"]]
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        errors = []
+
+        async def _crawl_one(url):
+            # Each page is isolated: a failure only empties its own slot
+            async with semaphore:
+                try:
+                    result = await crawler.arun(url=url, config=_run_config(url))
+                    if result.success:
+                        title = (result.metadata or {}).get("title") or url
+                        return (title, str(result.markdown))
+                    print(f"Failed to crawl {url}: {result.error_message}")
+                except Exception as e:
+                    print(f"Error crawling {url}: {e}")
+                    errors.append(e)
+                return None
+
+        return _crawl_one, errors
+
+    async def _restart_if_broken(self, crawled, errors):
+        if crawled and len(errors) == crawled:
+            # Every page raised: the browser is most likely gone, start a fresh one next job
+            print("⚠ crawl4ai browser appears broken. It will be restarted on the next job.")
+            await self._close_crawler()
+
+    async def _crawl(self, urls, headless, concurrency, page_futures=None):
+        crawl_one, errors = await self._page_crawler(headless, concurrency)
+
+        async def _crawl_and_publish(position, url):
+            started = time.time()
+            page = await crawl_one(url)
+            if page_futures:
+                page_futures[position].set_result((page, time.time() - started))
+            return page
+
+        # gather() returns results in input order regardless of completion order
+        pages = list(await asyncio.gather(*(_crawl_and_publish(i, url) for i, url in enumerate(urls))))
+        await self._restart_if_broken(len(urls), errors)
+        return pages
+
+    async def _crawl_feed(self, feed, headless, concurrency, publish):
+        crawl_one, errors = await self._page_crawler(headless, concurrency)
+        loop = asyncio.get_running_loop()
+        tasks = []
+
+        async def _crawl_and_publish(url, index):
+            started = time.time()
+            page = await crawl_one(url)
+            publish(url, index, page, time.time() - started)
+
+        while True:
+            # feed.get() blocks, so it waits on a worker thread rather than the loop
+            item = await loop.run_in_executor(None, feed.get)
+            if item is None:
+                break
+            tasks.append(asyncio.ensure_future(_crawl_and_publish(*item)))
+        await asyncio.gather(*tasks)
+        await self._restart_if_broken(len(tasks), errors)
+
+    def submit(self, urls, headless=True, concurrency=3):
+        """
+        Queues a crawl on the service loop. Returns a concurrent.futures.Future whose
+        result is one (page_title, markdown) tuple per URL, or None where crawling failed.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._crawl(list(urls), headless, concurrency), loop)
+
+    def submit_pages(self, urls, headless=True, concurrency=3):
+        """
+        Like submit(), but returns one Future per URL that resolves to (page, seconds)
+        as soon as that page is done, so callers can stream results.
+        """
+        urls = list(urls)
+        page_futures = [Future() for _ in urls]
+        job = asyncio.run_coroutine_threadsafe(
+            self._crawl(urls, headless, concurrency, page_futures), self._ensure_loop()
+        )
+
+        def _fail_pending(job):
+            # e.g. the browser failed to start: no page will ever be published
+            error = job.exception() if not job.cancelled() else RuntimeError("crawl cancelled")
+            if error:
+                for future in page_futures:
+                    if not future.done():
+                        future.set_exception(error)
+
+        job.add_done_callback(_fail_pending)
+        return page_futures
+
+    def submit_feed(self, feed, publish, headless=True, concurrency=3):
+        """
+        Crawls (url, index) pairs from a UrlFeed as they arrive, at most `concurrency` at
+        a time, calling publish(url, index, page, seconds) for each. Returns a Future that
+        resolves once the feed is closed and every page is done.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._crawl_feed(feed, headless, concurrency, publish), self._ensure_loop()
+        )
+
+    def shutdown(self, timeout=10):
+        """Closes the crawler and stops the loop thread. The service restarts on the next submit()."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_crawler(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        self._crawler_lock = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_crawl4ai_service():
+    """Returns the process-wide Crawl4aiService, or None when crawl4ai is not installed."""
+    global _service
+    if not is_crawl4ai_available():
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = Crawl4aiService()
+            atexit.register(_service.shutdown)
+        return _service
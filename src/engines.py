@@ -0,0 +1,281 @@
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+from page_cache import PageCache
+
+try:
+    import config_manager
+except ImportError:
+    config_manager = None
+
+
+class ScraperEngine:
+    """
+    One way of turning URLs into Markdown. Subclasses set `name` (also the key used in
+    engine stats) and implement iter_pages(); scraper.iter_scrape chains them per URL.
+    """
+
+    name = None
+    # Exclusive engines (browsers) run one open batch per job, fed through iter_feed():
+    # URLs that reach them later join the running workers, so their worker limits hold
+    exclusive = False
+    # Renders pages in a real browser, so it gets past JS shells and bot challenges
+    browser = False
+
+    def is_available(self, config):
+        return True
+
+    def supports(self, url, config):
+        return True
+
+    def iter_pages(self, urls, indices, context):
+        """
+        Yields one result dict per URL (see scraper.iter_scrape) as each one finishes.
+        A page with markdown None counts as a failure and moves on to the next engine;
+        it may carry 'partial': (title, text) to use if every later engine fails too,
+        or 'skipped': True when the engine did not actually try (kept out of the stats).
+        context holds config, headless, use_cache, min_chars and browser_fallback (the
+        URLs that have a browser engine later in their chain).
+        """
+        raise NotImplementedError
+
+    def iter_feed(self, feed, context):
+        """
+        Exclusive engines only: like iter_pages(), but the (url, index) pairs come from
+        feed (a UrlFeed) and keep arriving until the feed is closed.
+        """
+        raise NotImplementedError
+
+
+class UrlFeed:
+    """
+    Thread-safe queue of (url, index) pairs for an engine batch that is already running.
+    get() blocks until a pair arrives, and returns None for every reader once closed.
+    total is the job's URL count, for progress labels.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.taken = []
+        self._queue = queue.Queue()
+        self._closed = False
+
+    def add(self, url, index):
+        self._queue.put((url, index))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def get(self):
+        item = self._queue.get()
+        if item is None:
+            # Leave the marker for the other readers
+            self._queue.put(None)
+            return None
+        self.taken.append(item)
+        return item
+
+    def drain(self):
+        """Removes and returns the pairs nobody has taken yet."""
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not None:
+                items.append(item)
+
+
+ENGINES = {}
+
+
+def register_engine(engine):
+    """Adds (or replaces) an engine instance in the registry under its name."""
+    ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(name):
+    return ENGINES.get(name)
+
+
+def _host(url):
+    return (urlparse(url).hostname or '').lower()
+
+
+class EngineStats:
+    """
+    Persistent per-host, per-engine scrape history: attempts, success rate, and the
+    average content length and latency of successful pages. Rates and averages are
+    moving averages. An engine that has worked on a host needs min_attempts before it can
+    be demoted there, and engines cheaper than a host's incumbent are re-tried now and
+    then (see rank), so one bad page never demotes an engine for good.
+    """
+
+    def __init__(self, path, alpha=0.3, min_success_rate=0.5, max_age=90 * 86400,
+                 min_attempts=3, explore_every=10, retry_after=86400):
+        self.path = path
+        self.alpha = alpha
+        self.min_success_rate = min_success_rate
+        self.max_age = max_age
+        self.min_attempts = min_attempts
+        self.explore_every = explore_every
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._dirty = False
+        # In-memory only: URLs ranked per host, and when an engine was last re-tried
+        self._ranked = {}
+        self._explored = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._hosts = json.load(f)
+        except (OSError, ValueError):
+            self._hosts = {}
+
+    def record(self, url, engine, success, chars=0, latency=0.0):
+        with self._lock:
+            entry = self._hosts.setdefault(_host(url), {}).get(engine)
+            if entry is None:
+                entry = {'attempts': 0, 'successes': 0, 'success_rate': float(success), 'chars': 0, 'latency': 0.0}
+                self._hosts[_host(url)][engine] = entry
+            entry['attempts'] += 1
+            entry['success_rate'] += self.alpha * (float(success) - entry['success_rate'])
+            if success:
+                # The first success seeds the averages instead of being blended with zero
+                weight = 1.0 if not entry['successes'] else self.alpha
+                entry['successes'] += 1
+                entry['chars'] = round(entry['chars'] + weight * (chars - entry['chars']))
+                entry['latency'] = round(entry['latency'] + weight * (latency - entry['latency']), 2)
+            entry['success_rate'] = round(entry['success_rate'], 3)
+            entry['updated'] = time.time()
+            self._dirty = True
+
+    def get(self, url, engine):
+        with self._lock:
+            entry = self._hosts.get(_host(url), {}).get(engine)
+            return dict(entry) if entry else None
+
+    def is_proven(self, url, engine):
+        """True once the engine has min_attempts on the URL's host and usually succeeds there."""
+        return self._is_proven(self.get(url, engine))
+
+    def reliability(self, entry):
+        """
+        Share of successful attempts in a history entry: the plain successes/attempts
+        ratio until the moving average has seen about 2/alpha samples, where a single
+        bad page can no longer flip it, then the moving average.
+        """
+        if entry['attempts'] < 2 / self.alpha:
+            return entry['successes'] / entry['attempts'] if entry['attempts'] else 0.0
+        return entry['success_rate']
+
+    def _is_proven(self, entry):
+        return bool(entry and entry['attempts'] >= self.min_attempts
+                    and self.reliability(entry) >= self.min_success_rate)
+
+    def rank(self, url, candidates, explore=True):
+        """
+        Orders candidate engine names (cheapest first) for a URL: engines that usually
+        succeed on the host, fastest first; then untried engines and engines that have
+        succeeded there but have fewer than min_attempts, in their given order; then
+        engines that usually fail or have never succeeded there, most reliable first.
+
+        With explore=True, every explore_every-th URL on a host, or once a cheaper engine
+        has not run there for retry_after seconds, the stalest engine that is cheaper than
+        the incumbent and not proven on the host goes first, so its history is refreshed.
+        """
+        host = _host(url)
+        with self._lock:
+            history = dict(self._hosts.get(host, {}))
+            count = 0
+            if explore:
+                count = self._ranked[host] = self._ranked.get(host, 0) + 1
+
+        def key(item):
+            position, name = item
+            entry = history.get(name)
+            if not entry:
+                return (1, position, 0)
+            if self._is_proven(entry):
+                return (0, entry['latency'], position)
+            if entry['attempts'] < self.min_attempts and entry['successes']:
+                return (1, position, 0)
+            # Never above an engine that has worked here: under-sampled misses count as failing
+            return (2, -self.reliability(entry), position)
+
+        ranked = [name for _, name in sorted(enumerate(candidates), key=key)]
+        if not explore or not ranked or not self._is_proven(history.get(ranked[0])):
+            return ranked
+
+        cheaper = [name for name in candidates[:candidates.index(ranked[0])]
+                   if not self._is_proven(history.get(name))]
+        if not cheaper:
+            return ranked
+        with self._lock:
+            last_run = {name: max((history.get(name) or {}).get('updated', 0), self._explored.get((host, name), 0))
+                        for name in cheaper}
+            stalest = min(cheaper, key=last_run.get)
+            now = time.time()
+            if not (self.explore_every and count % self.explore_every == 0) and now - last_run[stalest] < self.retry_after:
+                return ranked
+            self._explored[(host, stalest)] = now
+        ranked.remove(stalest)
+        return [stalest] + ranked
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            cutoff = time.time() - self.max_age
+            for host in list(self._hosts):
+                engines = {name: entry for name, entry in self._hosts[host].items() if entry.get('updated', 0) >= cutoff}
+                if engines:
+                    self._hosts[host] = engines
+                else:
+                    del self._hosts[host]
+            data = json.dumps(self._hosts, indent=1)
+            self._dirty = False
+        try:
+            PageCache._write_atomic(self.path, data, 'w')
+        except OSError as e:
+            print(f"⚠ Could not save engine stats: {e}")
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_engine_stats(config=None):
+    """
+    Returns the shared EngineStats stored in '<save_location>/.engine_stats.json',
+    or None when 'engine_learning' is switched off in config.
+    """
+    global _stats
+    if config is None:
+        config = config_manager.load_config() if config_manager else {}
+    if not config.get('engine_learning', True):
+        return None
+
+    # Not under .page_cache: PageCache.prune()/clear() own every *.json file in there
+    directory = config.get('save_location', 'saved_characters')
+    path = os.path.join(directory, '.engine_stats.json')
+    with _stats_lock:
+        if _stats is None or _stats.path != path:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"⚠ Engine stats disabled: {e}")
+                return None
+            _stats = EngineStats(path)
+        return _stats
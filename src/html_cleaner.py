@@ -0,0 +1,639 @@
+import atexit
+import hashlib
+import html as html_lib
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bs4 import BeautifulSoup, NavigableString, Tag, Comment
+from page_cache import get_markdown_cache
+
+try:
+    import config_manager
+except ImportError:
+    config_manager = None
+
+# Bump when cleaner behaviour changes in a way the source fingerprint cannot see
+# (e.g. a BeautifulSoup upgrade); the Markdown cache key includes it.
+CLEANER_VERSION = 2
+
+
+# Tree builders in order of preference. html5lib is the most lenient but slower than
+# html.parser, so it is only used when selected explicitly via 'html_parser' in config.
+PARSER_FALLBACK_CHAIN = ['lxml', 'html.parser']
+PARSER_MODULES = {'lxml': 'lxml', 'html5lib': 'html5lib', 'html.parser': None}
+
+
+def is_parser_available(name):
+    if name not in PARSER_MODULES:
+        return False
+    module = PARSER_MODULES[name]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def select_html_parser(preferred=None):
+    """First available BeautifulSoup tree builder: the preferred one, then the fallback chain."""
+    for name in ([preferred] if preferred else []) + PARSER_FALLBACK_CHAIN:
+        if is_parser_available(name):
+            return name
+    return 'html.parser'
+
+
+def _existing_config():
+    # Only read an existing config; importing the cleaner should not create one
+    if not config_manager or not os.path.exists(config_manager.CONFIG_FILE):
+        return {}
+    try:
+        return config_manager.load_config()
+    except Exception:
+        return {}
+
+
+HTML_PARSER = select_html_parser(_existing_config().get('html_parser'))
+
+
+def _cleaner_fingerprint():
+    """Hash of this module's source, so cached Markdown is invalidated by any cleaner edit."""
+    # Backends build slightly different trees from malformed HTML, so the parser is part of it
+    digest = hashlib.sha256(f"v{CLEANER_VERSION}:{HTML_PARSER}".encode('utf-8'))
+    try:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            digest.update(f.read())
+    except OSError:
+        # Frozen builds ship no source; fall back to the manual version
+        pass
+    return digest.hexdigest()
+
+
+CLEANER_FINGERPRINT = _cleaner_fingerprint()
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Closing actions of the converter. A close marker on the stack is (None, start, kind, arg):
+# everything written to the buffer since `start` is the node's rendered children.
+_CLOSE_WRAP = 0       # arg = (prefix, suffix): prefix + children.strip() + suffix
+_CLOSE_LI = 1         # arg = (indent, bullet)
+_CLOSE_BLOCKQUOTE = 2
+_CLOSE_LINK = 3       # arg = href
+_CLOSE_CELL = 4
+_CLOSE_TABLE = 5      # arg = number of cells in each non-empty row
+
+
+def node_to_markdown(root):
+    """
+    Converts a DOM subtree to Markdown with an explicit stack instead of recursion.
+
+    Each node is visited once and writes into a single list buffer; nodes that need
+    to post-process their children (strip, quote, table rows) collapse their slice of
+    the buffer when their close marker is popped.
+    """
+    out = []
+    # Open items are (node, list_depth, inside_table, is_cell)
+    stack = [(root, 0, root.find_parent('table') is not None, False)]
+
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            # Literal suffix, e.g. the newline closing a list
+            out.append(item)
+            continue
+
+        node = item[0]
+        if node is None:
+            _, start, kind, arg = item
+            if kind == _CLOSE_TABLE:
+                out[start:] = [_table_markdown(out[start:], arg)]
+                continue
+
+            inner = "".join(out[start:])
+            del out[start:]
+
+            if kind == _CLOSE_WRAP:
+                out.append(f"{arg[0]}{inner.strip()}{arg[1]}")
+            elif kind == _CLOSE_LI:
+                out.append(f"\n{arg[0]}{arg[1]}{inner.strip()}")
+            elif kind == _CLOSE_BLOCKQUOTE:
+                out.append("\n\n" + "\n".join(f"> {line}" for line in inner.strip().split("\n")) + "\n\n")
+            elif kind == _CLOSE_LINK:
+                text = inner.strip()
+                if text:
+                    out.append(f" [{text}]({arg}) " if arg.startswith('http') else f" [{text}] ")
+            elif kind == _CLOSE_CELL:
+                # Markdown tables cannot hold line breaks inside a cell
+                out.append(" ".join(inner.split()))
+            continue
+
+        if isinstance(node, NavigableString):
+            out.append(_WHITESPACE_RE.sub(' ', str(node)))
+            continue
+        if not isinstance(node, Tag):
+            continue
+
+        _, depth, in_table, is_cell = item
+        start = len(out)
+        if is_cell:
+            stack.append((None, start, _CLOSE_CELL, None))
+
+        tag = node.name
+        child_depth = depth
+
+        # Block Elements
+        if tag in _HEADINGS:
+            stack.append((None, start, _CLOSE_WRAP, (f"\n\n{'#' * int(tag[1])} ", "\n\n")))
+        elif tag == 'p':
+            stack.append((None, start, _CLOSE_WRAP, ("\n\n", "\n\n")))
+        elif tag in ('ul', 'ol'):
+            out.append("\n")
+            stack.append("\n")
+        elif tag == 'li':
+            bullet = "- " if node.parent and node.parent.name == 'ul' else "1. "
+            stack.append((None, start, _CLOSE_LI, ("  " * depth, bullet)))
+            child_depth = depth + 1
+        elif tag == 'blockquote':
+            stack.append((None, start, _CLOSE_BLOCKQUOTE, None))
+        elif tag in ('pre', 'code'):
+            if tag == 'code' and node.parent.name != 'pre':
+                stack.append((None, start, _CLOSE_WRAP, ("`", "`")))
+            else:
+                out.append(f"\n\n```\n{node.get_text()}\n```\n\n")
+                continue
+        elif tag == 'table':
+            if in_table:
+                # A table inside another table breaks Markdown, so it is flattened to text
+                stack.append((None, start, _CLOSE_WRAP, (" ", " ")))
+            else:
+                _open_table(node, stack, start)
+                continue
+            in_table = True
+        # Inline Elements
+        elif tag in ('strong', 'b'):
+            stack.append((None, start, _CLOSE_WRAP, (" **", "** ")))
+        elif tag in ('em', 'i'):
+            stack.append((None, start, _CLOSE_WRAP, (" *", "* ")))
+        elif tag == 'a':
+            stack.append((None, start, _CLOSE_LINK, node.get('href', '')))
+        elif tag == 'br':
+            out.append("\n")
+            continue
+        elif tag == 'hr':
+            out.append("\n\n---\n\n")
+            continue
+
+        stack.extend((child, child_depth, in_table, False) for child in reversed(node.contents))
+
+    return "".join(out)
+
+
+def _table_markdown(cells, row_sizes):
+    """Builds a GitHub Flavored Markdown table from rendered cell texts."""
+    table_md = "\n\n"
+    pos = 0
+    for row_index, size in enumerate(row_sizes):
+        table_md += "| " + " | ".join(cells[pos:pos + size]) + " |\n"
+        pos += size
+        # Separator line goes after the first row
+        if row_index == 0:
+            table_md += "| " + " | ".join(["---"] * size) + " |\n"
+    return table_md + "\n"
+
+
+def _open_table(node, stack, start):
+    """Queues the direct rows/cells of a top-level table (nested tables are ignored here)."""
+    rows = []
+    for child in node.children:
+        if child.name in ['thead', 'tbody', 'tfoot']:
+            rows.extend(child.find_all('tr', recursive=False))
+        elif child.name == 'tr':
+            rows.append(child)
+
+    row_cells = [row.find_all(['td', 'th'], recursive=False) for row in rows]
+    row_cells = [cells for cells in row_cells if cells]
+    if not rows:
+        return
+
+    stack.append((None, start, _CLOSE_TABLE, [len(cells) for cells in row_cells]))
+    # Cells restart list indentation, like a fresh conversion of each cell
+    stack.extend((cell, 0, True, True) for cells in reversed(row_cells) for cell in reversed(cells))
+
+
+# Noise removed before content detection. Tags are dropped by name; the class/id sets
+# mirror the selectors .comment, #comments, .advertisement, .sidebar, .menu, .cookie-banner,
+# .navbox, .infobox, .metadata, .toc, #toc; the substring pairs mirror
+# table[class*='navbox'], div[class*='navbox'] and table[class*='infobox'].
+NOISE_TAGS = {'script', 'style', 'noscript', 'meta', 'link', 'iframe', 'svg',
+              'canvas', 'form', 'nav', 'footer', 'aside', 'header', 'button', 'input'}
+NOISE_CLASSES = {'comment', 'advertisement', 'sidebar', 'menu', 'cookie-banner',
+                 'navbox', 'infobox', 'metadata', 'toc'}
+NOISE_IDS = {'comments', 'toc'}
+NOISE_CLASS_SUBSTRINGS = {'table': ('navbox', 'infobox'), 'div': ('navbox',)}
+
+
+def _is_noise(tag):
+    if tag.name in NOISE_TAGS:
+        return True
+    classes = tag.get('class') or []
+    if not NOISE_CLASSES.isdisjoint(classes) or tag.get('id') in NOISE_IDS:
+        return True
+    substrings = NOISE_CLASS_SUBSTRINGS.get(tag.name)
+    if substrings and classes:
+        class_attr = " ".join(classes)
+        return any(sub in class_attr for sub in substrings)
+    return False
+
+
+def prune_noise(soup):
+    """Removes noise tags, HTML comments and noise selectors in a single traversal."""
+    doomed = []
+    stack = list(reversed(soup.contents))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Comment):
+            doomed.append(node)
+        elif isinstance(node, Tag):
+            if _is_noise(node):
+                # Whole subtree goes; no need to look inside it
+                doomed.append(node)
+            else:
+                stack.extend(reversed(node.contents))
+
+    for node in doomed:
+        if isinstance(node, Comment):
+            node.extract()
+        else:
+            node.decompose()
+
+
+def _is_main_candidate(tag, rule):
+    if rule == 0:
+        return tag.name == 'article'
+    if rule == 1:
+        return tag.name == 'main'
+    if rule == 2:
+        return tag.get('role') == 'main'
+    if rule == 3:
+        return tag.get('id') == 'main-content'
+    return 'main-content' in (tag.get('class') or [])
+
+
+def extract_main_content(soup):
+    """
+    Prunes noise and returns the node holding the main content: the first match of
+    article, main, [role="main"], #main-content, .main-content (in that order), or else
+    the div/section with the best paragraph score.
+    """
+    # 1. Clean out completely irrelevant DOM elements
+    prune_noise(soup)
+    tags = soup.find_all(True)
+
+    # 2. Heuristic Content Detection
+    for rule in range(5):
+        for tag in tags:
+            if _is_main_candidate(tag, rule):
+                return tag
+
+    # Paragraph counts for every container, bottom-up in one post-order pass
+    # (reverse document order visits children before their parents)
+    p_counts = {}
+    for tag in reversed(tags):
+        total = 0
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                total += p_counts[id(child)] + (child.name == 'p')
+        p_counts[id(tag)] = total
+
+    best_candidate = soup.body if soup.body else soup
+    highest_score = -1
+    for candidate in tags:
+        if candidate.name not in ('div', 'section'):
+            continue
+        score = p_counts[id(candidate)]
+        class_id_text = ((candidate.get('class') or [''])[0] + " " + candidate.get('id', '')).lower()
+        if any(bad in class_id_text for bad in ['wrap', 'page', 'container', 'body']):
+            score -= 2
+            
+        if score > highest_score and score > 2:
+            highest_score = score
+            best_candidate = candidate
+            
+    return best_candidate
+
+
+# Infoboxes hold the densest facts on a wiki page (age, height, affiliations, voice
+# actors). They are noise to prune_noise, so they are read into a key: value block first.
+INFOBOX_SELECTOR = ".portable-infobox, .infobox, table[class*='infobox']"
+INFOBOX_SKIP_SELECTOR = "sup.reference, .reference, .mw-editsection, style, script, .noprint"
+_FACT_BREAK_TAGS = ['li', 'p', 'div', 'tr', 'th', 'td']
+MAX_FACT_VALUE_CHARS = 300
+# Values shorter than this are kept even when they also occur in the prose (e.g. "15", "Female")
+MIN_DEDUPE_VALUE_CHARS = 12
+
+
+def _fact_text(node):
+    """One fact value: line breaks and list items become '; '."""
+    for br in node.find_all('br'):
+        br.replace_with('\n')
+    for block in node.find_all(_FACT_BREAK_TAGS):
+        block.append('\n')
+    parts = [_WHITESPACE_RE.sub(' ', line).strip(' ,;') for line in node.get_text().split('\n')]
+    value = '; '.join(part for part in parts if part)
+    return value[:MAX_FACT_VALUE_CHARS].rstrip() + ('…' if len(value) > MAX_FACT_VALUE_CHARS else '')
+
+
+def _fact_label(node):
+    return _WHITESPACE_RE.sub(' ', node.get_text(' ')).strip().rstrip(':').strip()
+
+
+def _infobox_facts(box):
+    """(label, value) pairs from one infobox: Fandom portable-infobox items, label/data table rows or dt/dd pairs."""
+    facts = []
+    # Citations and edit links go once, up front: dropping them while reading values
+    # could decompose an item or row that was already collected
+    for skip in box.select(INFOBOX_SKIP_SELECTOR):
+        if not skip.decomposed:
+            skip.decompose()
+    title = box.select_one('.pi-title')
+    if title:
+        facts.append(('Name', _fact_text(title)))
+    if box.select_one('.pi-item'):
+        for item in box.select('.pi-data, .pi-horizontal-group'):
+            if 'pi-horizontal-group' in (item.get('class') or []):
+                labels = [_fact_label(th) for th in item.select('th')]
+                values = [_fact_text(td) for td in item.select('td')]
+                facts.extend(zip(labels, values))
+                continue
+            label, value = item.select_one('.pi-data-label'), item.select_one('.pi-data-value')
+            if value:
+                name = _fact_label(label) if label else item.get('data-source', '').replace('_', ' ').capitalize()
+                facts.append((name, _fact_text(value)))
+        return facts
+
+    for row in box.find_all('tr'):
+        cell = row.find_parent(['td', 'th'])
+        if cell is not None and any(parent is box for parent in cell.parents):
+            continue   # row of a table nested inside a value
+        label, value = row.find('th', recursive=False), row.find('td', recursive=False)
+        if label and value:
+            facts.append((_fact_label(label), _fact_text(value)))
+    for term in box.find_all('dt'):
+        value = term.find_next_sibling('dd')
+        if value:
+            facts.append((_fact_label(term), _fact_text(value)))
+    return facts
+
+
+def extract_infobox_facts(soup):
+    """
+    Reads every outermost infobox into (label, value) pairs, in page order and without
+    repeats, and removes the infoboxes from the tree.
+    """
+    boxes = soup.select(INFOBOX_SELECTOR)
+    seen_boxes = set()
+    facts, seen = [], set()
+    for box in boxes:
+        seen_boxes.add(id(box))
+        if any(id(parent) in seen_boxes for parent in box.parents):
+            continue   # a sub-box, already covered by its outer infobox
+        for label, value in _infobox_facts(box):
+            key = (label.lower(), value.lower())
+            if label and value and key not in seen:
+                seen.add(key)
+                facts.append((label, value))
+    for box in boxes:
+        if not box.decomposed and not any(id(parent) in seen_boxes for parent in box.parents):
+            box.decompose()
+    return facts
+
+
+def format_facts(facts, prose):
+    """
+    The compact 'Label: value' block put above a page's text. Value parts (split on '; ')
+    that the prose already states are left out, as are facts with nothing left.
+    """
+    prose = _WHITESPACE_RE.sub(' ', prose).lower()
+    lines = []
+    for label, value in facts:
+        parts = [part for part in value.split('; ')
+                 if len(part) < MIN_DEDUPE_VALUE_CHARS or part.lower() not in prose]
+        if parts:
+            lines.append(f"{label}: {'; '.join(parts)}")
+    return "Facts:\n" + "\n".join(lines) if lines else ""
+
+
+# Browser-side twin of prune_noise + extract_main_content, for Selenium's in-browser
+# extraction mode. It works on a clone of the live DOM (the page itself is untouched)
+# and returns [title, main content outerHTML, outerHTML of each outermost infobox
+# (read into facts by the Python cleaner)]. The full document is never serialized.
+BROWSER_EXTRACT_JS = """
+const NOISE_TAGS = new Set(%(tags)s), NOISE_CLASSES = new Set(%(classes)s);
+const NOISE_IDS = new Set(%(ids)s), NOISE_CLASS_SUBSTRINGS = %(substrings)s;
+const root = document.documentElement.cloneNode(true);
+const INFOBOX_SELECTOR = %(infobox)s;
+const infoboxes = Array.from(root.querySelectorAll(INFOBOX_SELECTOR))
+    .filter(el => !el.parentElement || !el.parentElement.closest(INFOBOX_SELECTOR))
+    .map(el => el.outerHTML);
+
+function isNoise(el) {
+    if (NOISE_TAGS.has(el.localName)) return true;
+    const classes = Array.from(el.classList);
+    if (classes.some(c => NOISE_CLASSES.has(c)) || NOISE_IDS.has(el.getAttribute('id'))) return true;
+    const substrings = NOISE_CLASS_SUBSTRINGS[el.localName];
+    if (substrings && classes.length) {
+        const classAttr = classes.join(' ');
+        return substrings.some(sub => classAttr.includes(sub));
+    }
+    return false;
+}
+
+const doomed = [], stack = [root];
+while (stack.length) {
+    for (const child of stack.pop().childNodes) {
+        if (child.nodeType === Node.COMMENT_NODE) doomed.push(child);
+        else if (child.nodeType === Node.ELEMENT_NODE) (isNoise(child) ? doomed : stack).push(child);
+    }
+}
+doomed.forEach(node => node.remove());
+
+const tags = Array.from(root.querySelectorAll('*'));
+const rules = [
+    t => t.localName === 'article',
+    t => t.localName === 'main',
+    t => t.getAttribute('role') === 'main',
+    t => t.getAttribute('id') === 'main-content',
+    t => t.classList.contains('main-content'),
+];
+let main = null;
+for (const rule of rules) {
+    main = tags.find(rule);
+    if (main) break;
+}
+if (!main) {
+    const pCounts = new Map();
+    for (let i = tags.length - 1; i >= 0; i--) {
+        let total = 0;
+        for (const child of tags[i].children) total += pCounts.get(child) + (child.localName === 'p' ? 1 : 0);
+        pCounts.set(tags[i], total);
+    }
+    main = root.querySelector('body') || root;
+    let highest = -1;
+    for (const candidate of tags) {
+        if (candidate.localName !== 'div' && candidate.localName !== 'section') continue;
+        let score = pCounts.get(candidate);
+        const classIdText = ((candidate.classList[0] || '') + ' ' + (candidate.getAttribute('id') || '')).toLowerCase();
+        if (['wrap', 'page', 'container', 'body'].some(bad => classIdText.includes(bad))) score -= 2;
+        if (score > highest && score > 2) {
+            highest = score;
+            main = candidate;
+        }
+    }
+}
+return [document.title, main.outerHTML, infoboxes];
+""" % {
+    'tags': json.dumps(sorted(NOISE_TAGS)),
+    'classes': json.dumps(sorted(NOISE_CLASSES)),
+    'ids': json.dumps(sorted(NOISE_IDS)),
+    'substrings': json.dumps(NOISE_CLASS_SUBSTRINGS),
+    'infobox': json.dumps(INFOBOX_SELECTOR),
+}
+
+
+def wrap_extracted_html(title, main_html, infoboxes=()):
+    """
+    Wraps main content extracted in the browser in a minimal document, with the page's
+    infoboxes ahead of it. The <main> wrapper makes extract_main_content pick the same
+    node again, so the result can be cached and re-cleaned like any rendered page.
+    """
+    return (f"<html><head><title>{html_lib.escape(title or '')}</title></head>"
+            f"<body>{''.join(infoboxes)}<main>{main_html}</main></body></html>")
+
+
+def clean_and_format_text(soup, detect_main=True):
+    """
+    Advanced Readability-based Content Extractor and Markdown Generator.
+    Drastically improved to ignore noise and perfectly format tables/lists.
+    With detect_main=False the body is taken as already pruned main content.
+    Infobox facts are read first and put above the text (see format_facts).
+    """
+    facts = extract_infobox_facts(soup)
+    main_content = extract_main_content(soup) if detect_main else (soup.body or soup)
+
+    # 3. HTML to Markdown conversion
+    raw_md = node_to_markdown(main_content)
+    
+    # Cleanup regexes
+    cleaned_md = re.sub(r'\n{3,}', '\n\n', raw_md)          # Max 2 newlines
+    cleaned_md = re.sub(r' +(\n|$)', r'\1', cleaned_md)     # Trailing spaces
+    cleaned_md = re.sub(r'( \*\*|\*\* )', '**', cleaned_md) # Bold spacing
+    cleaned_md = re.sub(r'( \*|\* )', '*', cleaned_md)      # Italic spacing
+    # Remove pipes vazios excessivos que sobram de tabelas complexas
+    cleaned_md = re.sub(r'\|\s+\|\s+\|', '| |', cleaned_md) 
+    
+    facts_block = format_facts(facts, cleaned_md)
+    return f"{facts_block}\n\n{cleaned_md.strip()}".strip()
+
+
+# Pages at least this large (bytes) are cleaned in a worker process; smaller ones stay
+# inline, where parsing is cheaper than shipping the HTML and Markdown between processes
+DEFAULT_PROCESS_THRESHOLD = 200 * 1024
+
+_pool = None
+_pool_settings = None
+_pool_lock = threading.Lock()
+
+
+def _cleaning_settings():
+    """(threshold_bytes, workers) from 'cleaning_process_threshold_kb' / 'cleaning_workers' in config."""
+    global _pool_settings
+    if _pool_settings is None:
+        config = _existing_config()
+        # Leave a core for the GUI/scrape threads; single-core machines always clean inline
+        workers = config.get('cleaning_workers', max(0, min(4, (os.cpu_count() or 1) - 1)))
+        threshold = config.get('cleaning_process_threshold_kb', DEFAULT_PROCESS_THRESHOLD // 1024)
+        _pool_settings = (int(threshold) * 1024, int(workers or 0))
+    return _pool_settings
+
+
+def get_cleaning_pool():
+    """
+    Returns the shared process pool for HTML cleaning, or None when 'cleaning_workers'
+    is 0 or the pool broke earlier. Workers are spawned (not forked) so they never
+    inherit the GUI's or the scraper's threads.
+    """
+    global _pool
+    _, workers = _cleaning_settings()
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(shutdown_cleaning_pool)
+        return _pool or None
+
+
+def shutdown_cleaning_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _convert(html, detect_main=True, parser=None):
+    """Parse + clean + Markdown; top-level so worker processes can run it."""
+    # Let BeautifulSoup handle charset parsing from raw bytes natively
+    soup = BeautifulSoup(html, parser or HTML_PARSER)
+    page_title = soup.title.string.strip() if soup.title and soup.title.string else "Untitled Page"
+    return clean_and_format_text(soup, detect_main), page_title
+
+
+def _convert_in_pool(html, detect_main):
+    """Runs _convert in the cleaning pool, or inline below the size threshold or without a pool."""
+    global _pool
+    threshold, _ = _cleaning_settings()
+    pool = get_cleaning_pool() if len(html) >= threshold else None
+    if pool:
+        try:
+            future = pool.submit(_convert, html, detect_main, HTML_PARSER)
+        except RuntimeError:
+            # Pool already shut down (interpreter exit)
+            return _convert(html, detect_main)
+        try:
+            # The calling thread just waits (GIL released), so other fetches keep going meanwhile.
+            # Errors raised by _convert itself propagate as they would inline.
+            return future.result()
+        except (BrokenProcessPool, pickle.PicklingError) as e:
+            print(f"⚠ HTML cleaning pool failed ({type(e).__name__}: {e}). Cleaning inline from now on.")
+            with _pool_lock:
+                if _pool is pool:
+                    _pool = False
+            pool.shutdown(wait=False, cancel_futures=True)
+    return _convert(html, detect_main)
+
+
+def html_to_markdown(html, use_cache=True, detect_main=True):
+    """
+    Parses raw HTML with HTML_PARSER and returns (formatted_text, page_title).
+    Results are cached by a hash of the HTML plus the cleaner fingerprint.
+    Pass detect_main=False for documents from wrap_extracted_html().
+    Large pages are cleaned in the process pool (see get_cleaning_pool).
+    """
+    cache = get_markdown_cache() if use_cache else None
+    if cache:
+        raw = html.encode('utf-8') if isinstance(html, str) else html
+        mode = b'main' if detect_main else b'extracted'
+        key = hashlib.sha256(CLEANER_FINGERPRINT.encode('ascii') + b'\0' + mode + b'\0' + raw).hexdigest()
+        cached = cache.get(key)
+        if cached:
+            return cached
+
+    result = _convert_in_pool(html, detect_main)
+
+    if cache:
+        cache.put(key, *result)
+    return result
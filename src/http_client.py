@@ -0,0 +1,430 @@
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+# API traffic says what it is instead of posing as a browser
+CLIENT_USER_AGENT = f'charmaker python-requests/{requests.__version__}'
+
+# urllib3 lists only the encodings it can actually decode here (br/zstd need brotli/zstandard)
+SUPPORTED_ENCODINGS = ACCEPT_ENCODING.replace(',', ', ')
+
+# Retry/timeout/header policy per kind of traffic
+PROFILES = {
+    # Page fetches: idempotent, retry server errors quickly. 429 is left to the HostLimiter,
+    # which honours Retry-After for the whole host instead of sleeping per connection, and
+    # 503 is not retried: it is how bot-protection challenges answer, and those need a browser
+    'scrape': {
+        'retries': 2,
+        'backoff_factor': 0.5,
+        'status_forcelist': [500, 502, 504],
+        'host_limited': True,
+        # urllib3 would otherwise sleep through any 429 carrying Retry-After on its own
+        'respect_retry_after': False,
+        # Hand the last response back once retries run out (instead of RetryError), so
+        # callers can still see e.g. a Cloudflare 503 challenge and its headers
+        'raise_on_status': False,
+        'allowed_methods': ['HEAD', 'GET', 'OPTIONS'],
+        'timeout': 20,
+        'headers': {
+            # Modernized headers to mimic a real Chromium browser and bypass basic WAFs
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+            'Sec-Ch-Ua': '"Chromium";v="122", "Not(A:Brand";v="24", "Google Chrome";v="122"',
+            'Sec-Ch-Ua-Mobile': '?0',
+            'Sec-Ch-Ua-Platform': '"Windows"',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Upgrade-Insecure-Requests': '1',
+            'DNT': '1',
+        },
+    },
+    # Image downloads: short timeouts, a failed status is reported to the caller as-is
+    'image': {
+        'retries': 2,
+        'backoff_factor': 0.3,
+        'status_forcelist': [500, 502, 503, 504],
+        'allowed_methods': ['HEAD', 'GET'],
+        'timeout': 10,
+        'raise_on_status': False,
+        'headers': {
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+        },
+    },
+    # LLM API calls: POST is retried only when the request was rejected before processing
+    # (connect errors and the statuses below). A read timeout may mean the completion is
+    # already running and billed, so it is never re-sent
+    'api': {
+        'retries': 2,
+        'read_retries': 0,
+        'other_retries': 0,
+        'backoff_factor': 1.0,
+        'status_forcelist': [429, 502, 503],
+        'allowed_methods': ['POST', 'GET'],
+        'timeout': 60,
+        'raise_on_status': False,
+        'headers': {'User-Agent': CLIENT_USER_AGENT, 'Accept': 'application/json'},
+    },
+}
+
+
+# Hard caps on decoded response bodies, enforced while streaming (see read_limited)
+MAX_PAGE_BYTES = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 512
+
+# Leading magic bytes of formats a scrape can stumble on
+_MAGIC_TYPES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'\x00\x00\x01\x00', 'image/x-icon'),
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'7z\xbc\xaf\x27\x1c', 'application/x-7z-compressed'),
+    (b'Rar!', 'application/x-rar'),
+    (b'\x1aE\xdf\xa3', 'video/webm'),
+    (b'ID3', 'audio/mpeg'),
+    (b'OggS', 'audio/ogg'),
+)
+_HTML_STARTS = (b'<!doctype html', b'<html', b'<head', b'<body', b'<!--', b'<?xml')
+
+
+class TLSAdapter(HTTPAdapter):
+    """Custom adapter to handle various TLS/SSL configurations robustly."""
+    def __init__(self, ssl_context=None, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context:
+            kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+
+def create_session(profile='scrape', verify_ssl=True, pool_connections=32, pool_maxsize=16):
+    """
+    Builds a keep-alive session for one of PROFILES. The adapter keeps a connection
+    pool per host (up to pool_connections hosts, pool_maxsize connections each).
+    """
+    settings = PROFILES[profile]
+    session = requests.Session()
+
+    retry_strategy = Retry(
+        total=settings['retries'],
+        backoff_factor=settings['backoff_factor'],
+        status_forcelist=settings['status_forcelist'],
+        allowed_methods=settings['allowed_methods'],
+        read=settings.get('read_retries'),
+        other=settings.get('other_retries'),
+        raise_on_status=settings.get('raise_on_status', True),
+        respect_retry_after_header=settings.get('respect_retry_after', True),
+    )
+    adapter_args = {'max_retries': retry_strategy, 'pool_connections': pool_connections, 'pool_maxsize': pool_maxsize}
+
+    if not verify_ssl:
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        ssl_context.set_ciphers('DEFAULT:@SECLEVEL=1')
+        adapter = TLSAdapter(ssl_context=ssl_context, **adapter_args)
+        session.verify = False
+    else:
+        adapter = HTTPAdapter(**adapter_args)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'Accept-Encoding': SUPPORTED_ENCODINGS,
+        'Connection': 'keep-alive',
+    })
+    session.headers.update(settings['headers'])
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(profile='scrape', verify_ssl=True):
+    """Returns the process-wide pooled session for a profile, so every caller reuses TCP/TLS connections."""
+    key = (profile, verify_ssl)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = create_session(profile, verify_ssl)
+            _sessions[key] = session
+        return session
+
+
+class HostLimiter:
+    """
+    Per-host politeness: at most max_concurrency HTTP requests and max_browser_concurrency
+    browser page loads in flight, and one start (of either kind) per min_interval seconds
+    for each host. A 429/Retry-After pauses the whole host. Different hosts never wait
+    on each other.
+    """
+
+    def __init__(self, max_concurrency=2, min_interval=0.5, max_retry_after=60, max_browser_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self.max_browser_concurrency = max_browser_concurrency
+        self.min_interval = min_interval
+        self.max_retry_after = max_retry_after
+        self._cond = threading.Condition()
+        self._hosts = {}
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {
+            'active': 0, 'browser_active': 0, 'waiting': 0, 'next_at': 0.0,
+            'requests': 0, 'throttled': 0, 'waited': 0.0,
+        })
+
+    def acquire(self, url, browser=False):
+        """
+        Blocks until the host has a free slot (an HTTP or, with browser=True, a browser
+        one) and its pacing interval has passed. Returns the host.
+        """
+        host = (urlparse(url).hostname or '').lower()
+        counter = 'browser_active' if browser else 'active'
+        limit = self.max_browser_concurrency if browser else self.max_concurrency
+        started = time.time()
+        with self._cond:
+            state = self._host(host)
+            state['waiting'] += 1
+            while True:
+                now = time.time()
+                if state[counter] < limit and now >= state['next_at']:
+                    break
+                # Slot-limited: wait for a release; pace-limited: wait until next_at
+                self._cond.wait(None if state[counter] >= limit else state['next_at'] - now)
+            state['waiting'] -= 1
+            state[counter] += 1
+            state['requests'] += 1
+            state['next_at'] = now + self.min_interval
+            state['waited'] += now - started
+        return host
+
+    def release(self, host, browser=False):
+        with self._cond:
+            self._host(host)['browser_active' if browser else 'active'] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, url, browser=False):
+        host = self.acquire(url, browser)
+        try:
+            yield host
+        finally:
+            self.release(host, browser)
+
+    def back_off(self, url, seconds):
+        """Pauses new requests to the URL's host for `seconds` (capped at max_retry_after)."""
+        host = (urlparse(url).hostname or '').lower()
+        with self._cond:
+            state = self._host(host)
+            state['throttled'] += 1
+            state['next_at'] = max(state['next_at'], time.time() + min(seconds, self.max_retry_after))
+            self._cond.notify_all()
+
+    def stats(self):
+        """Per-host counters: active, waiting, requests, throttled, waited (s) and paused_for (s)."""
+        now = time.time()
+        with self._cond:
+            return {
+                host: {
+                    'active': state['active'] + state['browser_active'],
+                    'waiting': state['waiting'],
+                    'requests': state['requests'],
+                    'throttled': state['throttled'],
+                    'waited': round(state['waited'], 2),
+                    'paused_for': round(max(0.0, state['next_at'] - now), 2),
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+_limiter = None
+
+
+def get_host_limiter(config=None):
+    """
+    Returns the shared HostLimiter. When config is given, its 'host_max_concurrency',
+    'host_max_browser_concurrency', 'host_min_interval' and 'host_max_retry_after'
+    settings are applied.
+    """
+    global _limiter
+    with _sessions_lock:
+        if _limiter is None:
+            _limiter = HostLimiter()
+        if config is not None:
+            _limiter.max_concurrency = max(1, int(config.get('host_max_concurrency', 2)))
+            # Browser loads have their own cap so selenium_workers can still run in parallel on one wiki
+            _limiter.max_browser_concurrency = max(1, int(config.get('host_max_browser_concurrency', 4)))
+            _limiter.min_interval = float(config.get('host_min_interval', 0.5))
+            _limiter.max_retry_after = float(config.get('host_max_retry_after', 60))
+        return _limiter
+
+
+def get_host_stats():
+    return get_host_limiter().stats()
+
+
+def interleave_by_host(urls):
+    """Indices of urls in round-robin host order, so a batch spreads across hosts instead of hammering one."""
+    by_host = {}
+    for index, url in enumerate(urls):
+        by_host.setdefault((urlparse(url).hostname or '').lower(), []).append(index)
+    queues = list(by_host.values())
+    order = []
+    while queues:
+        order.extend(q.pop(0) for q in queues)
+        queues = [q for q in queues if q]
+    return order
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def request(method, url, profile='scrape', verify_ssl=True, throttle_retries=2, **kwargs):
+    """
+    Sends a request over the shared session, applying the profile's default timeout.
+    Host-limited profiles go through the HostLimiter; a 429 pauses the host for its
+    Retry-After (or an exponential delay) and is retried up to throttle_retries times.
+    """
+    settings = PROFILES[profile]
+    kwargs.setdefault('timeout', settings['timeout'])
+    if not verify_ssl:
+        kwargs['verify'] = False
+    session = get_session(profile, verify_ssl)
+    if not settings.get('host_limited'):
+        return session.request(method, url, **kwargs)
+
+    limiter = get_host_limiter()
+    for attempt in range(throttle_retries + 1):
+        with limiter.slot(url):
+            response = session.request(method, url, **kwargs)
+        if response.status_code != 429 or attempt == throttle_retries:
+            return response
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        response.close()
+        limiter.back_off(url, delay if delay is not None else 2 ** (attempt + 1))
+    return response
+
+
+def get(url, profile='scrape', **kwargs):
+    return request('GET', url, profile, **kwargs)
+
+
+def head(url, profile='scrape', **kwargs):
+    kwargs.setdefault('allow_redirects', True)
+    return request('HEAD', url, profile, **kwargs)
+
+
+def post(url, profile='api', **kwargs):
+    return request('POST', url, profile, **kwargs)
+
+
+def sniff_content_type(head):
+    """
+    Guesses a body's type from its first bytes, regardless of what the server claims:
+    an image/..., audio/..., video/... or application/... type, 'text/html', 'text/plain',
+    or 'application/octet-stream' for unrecognised binary data.
+    """
+    for magic, kind in _MAGIC_TYPES:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[:2] == b'BM' and head[6:10] == b'\x00\x00\x00\x00':
+        return 'image/bmp'
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in (b'avif', b'avis'):
+            return 'image/avif'
+        return 'image/heic' if brand in (b'heic', b'heix', b'mif1') else 'video/mp4'
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'text/plain'   # UTF-16 BOM
+
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith(_HTML_STARTS) or b'<html' in text:
+        return 'text/html'
+    if b'\x00' in head:
+        return 'application/octet-stream'
+    return 'text/plain'
+
+
+def _check_sniffed(head, accept):
+    kind = sniff_content_type(head)
+    if not kind.startswith(accept):
+        raise ValueError(f"Unexpected content: body looks like {kind}, expected {' or '.join(accept)}")
+
+
+def read_limited(response, max_bytes, accept=None, chunk_size=CHUNK_SIZE):
+    """
+    Reads a streamed (stream=True) response body, aborting with ValueError as soon as it
+    grows past max_bytes. The cap applies to the decoded body, so compression bombs are
+    caught too. With accept (type prefixes such as ('image/',)), the first bytes are
+    sniffed and the download is aborted unless they match. The response is always closed.
+    """
+    try:
+        limit_mb = max_bytes / (1024 * 1024)
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > max_bytes:
+            raise ValueError(f"Response too large: {int(length) / (1024 * 1024):.1f}MB (limit {limit_mb:.1f}MB)")
+
+        body = bytearray()
+        sniffed = accept is None
+        for chunk in response.iter_content(chunk_size):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ValueError(f"Response exceeded the {limit_mb:.1f}MB limit while downloading")
+            if not sniffed and len(body) >= SNIFF_BYTES:
+                _check_sniffed(bytes(body[:SNIFF_BYTES]), accept)
+                sniffed = True
+        if not sniffed and body:
+            _check_sniffed(bytes(body), accept)
+        return bytes(body)
+    finally:
+        response.close()
+
+
+def download(url, max_bytes, profile='scrape', accept=None, **kwargs):
+    """GETs url as a stream and returns (response, body) with the body read through read_limited."""
+    response = get(url, profile, stream=True, **kwargs)
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response, read_limited(response, max_bytes, accept)
@@ -1,4 +1,5 @@
 import requests
+import http_client
 import io
 import base64
 import tempfile
@@ -70,29 +71,22 @@ class ImageHandler:
         
         return False
         
+    @staticmethod
+    def download(url, timeout=10):
+        """Downloads image bytes, aborting past MAX_SIZE_MB or when the body is not an image"""
+        _, image_data = http_client.download(
+            url, ImageHandler.MAX_SIZE_MB * 1024 * 1024, profile='image', accept=('image/',), timeout=timeout
+        )
+        return image_data
+    
     @staticmethod
     def load_from_url(url, timeout=10):
         """Load image from URL with robust error handling"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, stream=True, timeout=timeout)
-            response.raise_for_status()
-            
-            # Check content type
-            content_type = response.headers.get('content-type', '').lower()
-            if not content_type.startswith('image/'):
-                print(f"Warning: Content-Type is '{content_type}', not an image")
-            
-            # Check file size
-            content_length = response.headers.get('content-length')
-            if content_length and int(content_length) > ImageHandler.MAX_SIZE_MB * 1024 * 1024:
-                raise ValueError(f"Image too large: {int(content_length) / (1024*1024):.1f}MB")
+            # Streamed with a hard size cap; the first bytes must look like an image
+            image_data = ImageHandler.download(url, timeout)
             
             # Load and validate image
-            image_data = response.content
             image = Image.open(io.BytesIO(image_data))
             image.verify()  # Verify it's a valid image
             
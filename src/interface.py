@@ -1,9 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 import threading
+import multiprocessing
 import sys
 import os
-import requests
 import io
 from PIL import Image, ImageTk
 
@@ -12,7 +12,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from image_handler import ImageHandler
 from api_handler import APIHandler
-from scraper import scrape_with_selenium, scrape_with_crawl4ai
+from scraper import iter_scrape, collect_page_results, format_page_results
+from content_filter import filter_scraped_content
 from character_card import save_character_card
 import config_manager
 from main import parse_ai_response
@@ -323,10 +324,7 @@ class CharMakerTkinterApp:
         def load_img():
             try:
                 if path.startswith("http"):
-                    headers = {'User-Agent': 'Mozilla/5.0'}
-                    resp = requests.get(path, headers=headers, stream=True, timeout=5)
-                    resp.raise_for_status()
-                    img = Image.open(io.BytesIO(resp.content))
+                    img = Image.open(io.BytesIO(ImageHandler.download(path, timeout=5)))
                 else:
                     if not os.path.exists(path):
                         raise Exception("File not found")
@@ -524,14 +522,19 @@ using same 3 URLS + 1 image and gemini-3-flash-preview to generate.\n\n"""
             if urls_to_scrape:
                 self.update_status(f"Scraping URLs (fetching web content from {len(urls_to_scrape)} sources)...")
                 engine = self.config.get('scraper_engine', 'legacy (scraper.py)')
-                if engine == 'crawl4ai':
-                    headless = self.config.get('crawl4ai_headless', True)
-                    scraped_content = scrape_with_crawl4ai(urls_to_scrape, headless=headless)
-                    if scraped_content is None:
-                        # Fallback
-                        scraped_content = scrape_with_selenium(urls_to_scrape)
-                else:
-                    scraped_content = scrape_with_selenium(urls_to_scrape)
+                headless = self.config.get('crawl4ai_headless', True)
+                # Stream per-URL results so the status bar tracks each page as it lands
+                pages = []
+                for page in iter_scrape(urls_to_scrape, engine=engine, headless=headless,
+                                        tiered=self.config.get('requests_first', True)):
+                    pages.append(page)
+                    outcome = "✓" if page['markdown'] else "✗"
+                    self.update_status(f"Scraping URLs ({len(pages)}/{len(urls_to_scrape)} done): "
+                                       f"{outcome} {page['title'] or page['url']} [{page['engine'] or 'failed'}, {page['elapsed']:.1f}s]")
+                scraped_content = format_page_results(collect_page_results(pages, len(urls_to_scrape)), len(urls_to_scrape))
+                if scraped_content:
+                    self.update_status("Removing duplicate content across sources...")
+                    scraped_content = filter_scraped_content(scraped_content, self.config)
 
             if not scraped_content and not gen_image_objects:
                 self.end_loading()
@@ -616,10 +619,7 @@ using same 3 URLS + 1 image and gemini-3-flash-preview to generate.\n\n"""
 
     def download_image_to_temp(self, url):
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, stream=True, timeout=10)
-            response.raise_for_status()
-            return ImageHandler.save_temp_image(response.content)
+            return ImageHandler.save_temp_image(ImageHandler.download(url))
         except Exception:
             return None
 
@@ -657,6 +657,8 @@ using same 3 URLS + 1 image and gemini-3-flash-preview to generate.\n\n"""
                 return "./template.png"
 
 if __name__ == "__main__":
+    # HTML cleaning worker processes re-enter frozen builds through here
+    multiprocessing.freeze_support()
     try:
         from ctypes import windll
         windll.shcore.SetProcessDpiAwareness(1)
@@ -1,11 +1,12 @@
 import tiktoken
+import multiprocessing
 import os
 import re
-import requests
 import tempfile
 from image_handler import ImageHandler
 from api_handler import APIHandler
-from scraper import scrape_with_selenium, is_valid_url_format
+from scraper import scrape_tiered, is_valid_url_format
+from content_filter import filter_scraped_content
 from character_card import save_character_card
 import config_manager
 import file_dialogs 
@@ -76,10 +77,7 @@ def get_character_image():
                 continue
             
             try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                
-                temp_path = ImageHandler.save_temp_image(response.content)
+                temp_path = ImageHandler.save_temp_image(ImageHandler.download(url))
                 if temp_path:
                     print("✓ Image downloaded successfully")
                     return temp_path
@@ -131,9 +129,12 @@ def run_character_creation_flow(config):
     # scrape content if urls provided
     scraped_content = ""
     if urls:
-        scraped_content = scrape_with_selenium(urls)
+        scraped_content = scrape_tiered(urls, engine=engine, headless=config.get('crawl4ai_headless', True),
+                                        tiered=config.get('requests_first', True))
         if not scraped_content or not scraped_content.strip():
             print("Warning: No text content scraped.")
+        else:
+            scraped_content = filter_scraped_content(scraped_content, config)
     
     if not scraped_content and not initial_image_object:
         print("✗ Scraping failed and no image provided.")
@@ -503,4 +504,6 @@ def main():
             print("Invalid option. Please try again.")
 
 if __name__ == "__main__":
+    # HTML cleaning worker processes re-enter frozen builds through here
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import html
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse, parse_qs, unquote
+
+import http_client
+from html_cleaner import html_to_markdown
+from page_cache import get_page_cache
+
+
+# Hosts known to run MediaWiki, and where their api.php lives relative to the wiki root
+MEDIAWIKI_HOSTS = {
+    'fandom.com': '/api.php',
+    'wikia.org': '/api.php',
+    'wiki.gg': '/api.php',
+    'miraheze.org': '/w/api.php',
+    'wikipedia.org': '/w/api.php',
+    'wiktionary.org': '/w/api.php',
+    'wikiquote.org': '/w/api.php',
+    'wikisource.org': '/w/api.php',
+    'wikibooks.org': '/w/api.php',
+}
+API_CANDIDATES = ('/api.php', '/w/api.php')
+
+_WIKI_PATH_RE = re.compile(r'^(?P<prefix>(?:/[a-z]{2,3}(?:-[a-z]+)?)?)/wiki/(?P<title>.+)$', re.IGNORECASE)
+_INDEX_PATH_RE = re.compile(r'^(?P<prefix>.*?)(?:/w)?/index\.php$')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# (host, prefix) -> (api_url or None, checked_at); negative results are cached too
+_api_endpoints = {}
+_api_lock = threading.Lock()
+ENDPOINT_TTL = 6 * 3600
+
+
+def parse_wiki_url(url):
+    """Returns (prefix, title, oldid) for MediaWiki-style article URLs, else None."""
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    oldid = (query.get('oldid') or [None])[0]
+
+    match = _WIKI_PATH_RE.match(parsed.path)
+    if match:
+        return match.group('prefix'), unquote(match.group('title')).replace('_', ' '), oldid
+    match = _INDEX_PATH_RE.match(parsed.path)
+    if match and (query.get('title') or oldid):
+        title = (query.get('title') or [''])[0]
+        return match.group('prefix'), unquote(title).replace('_', ' '), oldid
+    return None
+
+
+def _known_api_path(host):
+    matches = [domain for domain in MEDIAWIKI_HOSTS if host == domain or host.endswith('.' + domain)]
+    return MEDIAWIKI_HOSTS[max(matches, key=len)] if matches else None
+
+
+def is_mediawiki_url(url):
+    """Cheap check: a wiki-style article URL on a known MediaWiki host or one whose API was found before."""
+    parsed = parse_wiki_url(url)
+    if not parsed:
+        return False
+    host = (urlparse(url).hostname or '').lower()
+    if _known_api_path(host):
+        return True
+    with _api_lock:
+        endpoint, _ = _api_endpoints.get((host, parsed[0]), (None, 0))
+    return endpoint is not None or (host, parsed[0]) not in _api_endpoints
+
+
+def _call_api(api_url, params, verify_ssl=True, max_bytes=http_client.MAX_PAGE_BYTES):
+    response = http_client.get(api_url, params=params, verify_ssl=verify_ssl, timeout=15, stream=True,
+                               headers={'Accept': 'application/json'})
+    if response.status_code != 200 or 'json' not in response.headers.get('content-type', ''):
+        response.close()
+        return None
+    return json.loads(http_client.read_limited(response, max_bytes, accept=('text/',)))
+
+
+def _find_api(url, prefix):
+    """Locates (and caches) the api.php endpoint for the URL's wiki, or None."""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    key = (host, prefix)
+    with _api_lock:
+        endpoint, checked_at = _api_endpoints.get(key, (None, 0))
+    if checked_at and time.time() - checked_at < ENDPOINT_TTL:
+        return endpoint
+
+    known = _known_api_path(host)
+    endpoint = f"{parsed.scheme}://{parsed.netloc}{prefix}{known}" if known else None
+    for path in () if known else API_CANDIDATES:
+        # Unknown hosts: probe the usual locations with a tiny siteinfo query
+        api_url = f"{parsed.scheme}://{parsed.netloc}{prefix}{path}"
+        try:
+            data = _call_api(api_url, {'action': 'query', 'meta': 'siteinfo', 'format': 'json', 'formatversion': 2})
+        except Exception:
+            data = None
+        if data and 'query' in data:
+            endpoint = api_url
+            break
+
+    with _api_lock:
+        _api_endpoints[key] = (endpoint, time.time())
+    return endpoint
+
+
+def fetch_mediawiki_html(url, use_cache=True, config=None):
+    """
+    Fetches an article's rendered body through api.php?action=parse and wraps it in a
+    minimal HTML document (title + <main>) for the regular cleaner. Returns None when
+    the URL is not a MediaWiki article or the API can't serve it.
+    """
+    parsed = parse_wiki_url(url)
+    if not parsed:
+        return None
+    prefix, title, oldid = parsed
+
+    cache = get_page_cache(config) if use_cache else None
+    entry = cache.get(url, variant='mediawiki') if cache else None
+    if entry and cache.is_fresh(entry):
+        return entry['body']
+
+    api_url = _find_api(url, prefix)
+    if not api_url:
+        return None
+
+    params = {
+        'action': 'parse', 'prop': 'text|displaytitle', 'redirects': 1,
+        'disableeditsection': 1, 'disabletoc': 1, 'format': 'json', 'formatversion': 2,
+    }
+    if oldid:
+        params['oldid'] = oldid
+    else:
+        params['page'] = title
+    max_bytes = int((config or {}).get('max_page_mb', 10) * 1024 * 1024)
+    try:
+        data = _call_api(api_url, params, max_bytes=max_bytes)
+    except Exception:
+        return None
+    page = (data or {}).get('parse')
+    if not page or not page.get('text'):
+        return None
+
+    display_title = html.unescape(_TAG_RE.sub('', page.get('displaytitle') or page.get('title') or title))
+    body = (f"<html><head><title>{html.escape(display_title)}</title></head>"
+            f"<body><main>{page['text']}</main></body></html>").encode('utf-8')
+    if cache:
+        cache.put(url, body, {}, variant='mediawiki')
+    return body
+
+
+def scrape_mediawiki(url, use_cache=True, config=None):
+    """Returns (formatted_text, page_title) from the MediaWiki API, or (None, None)."""
+    body = fetch_mediawiki_html(url, use_cache, config)
+    if body is None:
+        return None, None
+    return html_to_markdown(body)
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+try:
+    import config_manager
+except ImportError:
+    config_manager = None
+
+
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical cache key form: lowercase scheme/host, no fragment/default port/tracking params."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    query = [
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    query.sort()
+    return urlunparse((scheme, host, parsed.path or '/', '', urlencode(query), ''))
+
+
+class PageCache:
+    """
+    Persistent cache of fetched pages, keyed by normalized URL.
+
+    Each entry is a body file plus a JSON sidecar holding the response headers.
+    Entries younger than ttl are served as-is; older ones are revalidated with
+    If-None-Match / If-Modified-Since. Entries older than max_age are dropped, and
+    the least recently used ones are evicted when the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory, ttl=3600, max_age=7 * 86400, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url, variant):
+        key = hashlib.sha256(f"{variant}:{normalize_url(url)}".encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.body', base + '.json'
+
+    def get(self, url, variant='raw'):
+        """Returns the cached entry dict (with 'body' bytes) or None."""
+        body_path, meta_path = self._paths(url, variant)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('fetched_at', 0) > self.max_age:
+            self._remove(body_path, meta_path)
+            return None
+
+        # mtime of the sidecar doubles as the LRU access time
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('validated_at', entry.get('fetched_at', 0)) < self.ttl
+
+    @staticmethod
+    def validators(entry):
+        """Conditional request headers for revalidating an entry."""
+        headers = {}
+        stored = {k.lower(): v for k, v in (entry or {}).get('headers', {}).items()}
+        if stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored.get('last-modified'):
+            headers['If-Modified-Since'] = stored['last-modified']
+        return headers
+
+    def put(self, url, body, headers=None, variant='raw'):
+        body_path, meta_path = self._paths(url, variant)
+        now = time.time()
+        entry = {
+            'url': url,
+            'variant': variant,
+            'headers': dict(headers or {}),
+            'fetched_at': now,
+            'validated_at': now,
+            'size': len(body),
+        }
+        try:
+            self._write_atomic(body_path, body, 'wb')
+            self._write_atomic(meta_path, json.dumps(entry), 'w')
+        except OSError as e:
+            print(f"⚠ Page cache write failed: {e}")
+            return
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(body)
+            over_limit = self._size is None or self._size > self.max_bytes
+        if over_limit:
+            self.prune()
+
+    def mark_validated(self, url, variant='raw'):
+        """Refreshes an entry after the server answered 304 Not Modified."""
+        body_path, meta_path = self._paths(url, variant)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry['validated_at'] = time.time()
+            self._write_atomic(meta_path, json.dumps(entry), 'w')
+        except (OSError, ValueError):
+            pass
+
+    def prune(self):
+        """Drops expired entries, then evicts least recently used ones until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for item in os.scandir(self.directory):
+                if not item.name.endswith('.json'):
+                    continue
+                body_path = item.path[:-5] + '.body'
+                try:
+                    with open(item.path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    accessed = item.stat().st_mtime
+                except (OSError, ValueError):
+                    self._remove(body_path, item.path)
+                    continue
+                if now - meta.get('fetched_at', 0) > self.max_age:
+                    self._remove(body_path, item.path)
+                    continue
+                entries.append((accessed, meta.get('size', 0), body_path, item.path))
+
+            total = sum(size for _, size, _, _ in entries)
+            entries.sort()
+            while entries and total > self.max_bytes:
+                _, size, body_path, meta_path = entries.pop(0)
+                self._remove(body_path, meta_path)
+                total -= size
+            self._size = total
+
+    def clear(self):
+        with self._lock:
+            for item in os.scandir(self.directory):
+                if item.name.endswith(('.json', '.body')):
+                    self._remove(item.path)
+            self._size = 0
+
+    @staticmethod
+    def _write_atomic(path, data, mode):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(*paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class MarkdownCache:
+    """
+    Content-addressed store of cleaner output: key -> (markdown, page_title).
+
+    Keys are hashes of the raw HTML plus the cleaner fingerprint, so entries never
+    go stale; the least recently used ones are evicted past max_entries.
+    """
+
+    def __init__(self, directory, max_entries=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._count = None
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        path = os.path.join(self.directory, key + '.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return data.get('markdown'), data.get('title')
+
+    def put(self, key, markdown, title):
+        path = os.path.join(self.directory, key + '.json')
+        try:
+            PageCache._write_atomic(path, json.dumps({'markdown': markdown, 'title': title}), 'w')
+        except OSError:
+            return
+
+        with self._lock:
+            if self._count is not None:
+                self._count += 1
+            over_limit = self._count is None or self._count > self.max_entries
+        if over_limit:
+            self.prune()
+
+    def prune(self):
+        with self._lock:
+            entries = []
+            for item in os.scandir(self.directory):
+                if item.name.endswith('.json'):
+                    try:
+                        entries.append((item.stat().st_mtime, item.path))
+                    except OSError:
+                        pass
+            entries.sort()
+            while len(entries) > self.max_entries:
+                PageCache._remove(entries.pop(0)[1])
+            self._count = len(entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_markdown_cache = None
+
+
+def get_page_cache(config=None):
+    """
+    Returns the shared PageCache under '<save_location>/.page_cache',
+    or None when 'page_cache_enabled' is switched off in config.
+    """
+    global _cache
+    if config is None:
+        config = config_manager.load_config() if config_manager else {}
+    if not config.get('page_cache_enabled', True):
+        return None
+
+    directory = os.path.join(config.get('save_location', 'saved_characters'), '.page_cache')
+    with _cache_lock:
+        if _cache is None or _cache.directory != directory:
+            try:
+                _cache = PageCache(
+                    directory,
+                    ttl=config.get('page_cache_ttl', 3600),
+                    max_age=config.get('page_cache_max_age', 7 * 86400),
+                    max_bytes=int(config.get('page_cache_max_mb', 200)) * 1024 * 1024,
+                )
+            except OSError as e:
+                print(f"⚠ Page cache disabled: {e}")
+                return None
+        return _cache
+
+
+def get_markdown_cache(config=None):
+    """
+    Returns the shared MarkdownCache under '<save_location>/.page_cache/markdown',
+    or None when 'markdown_cache_enabled' is switched off in config.
+    """
+    global _markdown_cache
+    if config is None:
+        config = config_manager.load_config() if config_manager else {}
+    if not config.get('markdown_cache_enabled', True):
+        return None
+
+    directory = os.path.join(config.get('save_location', 'saved_characters'), '.page_cache', 'markdown')
+    with _cache_lock:
+        if _markdown_cache is None or _markdown_cache.directory != directory:
+            try:
+                _markdown_cache = MarkdownCache(directory, max_entries=config.get('markdown_cache_max_entries', 500))
+            except OSError as e:
+                print(f"⚠ Markdown cache disabled: {e}")
+                return None
+        return _markdown_cache
@@ -2,20 +2,22 @@ import time
 import re
 import ssl
 import os
-import urllib3
+import queue
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup, NavigableString, Tag, Comment
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import http_client
+from http_client import get_host_limiter, get_host_stats, interleave_by_host
+from browser_pool import get_browser_pool, is_driver_healthy
+from page_cache import get_page_cache
+from crawl4ai_service import get_crawl4ai_service, is_crawl4ai_available
+from engines import ScraperEngine, UrlFeed, ENGINES, register_engine, get_engine_stats
+from html_cleaner import clean_and_format_text, html_to_markdown, wrap_extracted_html, BROWSER_EXTRACT_JS
+from mediawiki import is_mediawiki_url, scrape_mediawiki
 
 # Assuming config_manager is a local module in your project
 try:
@@ -27,64 +29,6 @@ except ImportError:
         def save_config(self, cfg): pass
     config_manager = _MockConfig()
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-
-class TLSAdapter(HTTPAdapter):
-    """Custom adapter to handle various TLS/SSL configurations robustly."""
-    def __init__(self, ssl_context=None, **kwargs):
-        self.ssl_context = ssl_context
-        super().__init__(**kwargs)
-    
-    def init_poolmanager(self, *args, **kwargs):
-        if self.ssl_context:
-            kwargs['ssl_context'] = self.ssl_context
-        return super().init_poolmanager(*args, **kwargs)
-
-
-def create_session_with_retries(retries=3, backoff_factor=0.5, verify_ssl=True):
-    """Create a highly robust requests session with modern anti-bot headers and SSL fallbacks."""
-    session = requests.Session()
-    
-    retry_strategy = Retry(
-        total=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    
-    if not verify_ssl:
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        ssl_context.set_ciphers('DEFAULT:@SECLEVEL=1')
-        adapter = TLSAdapter(ssl_context=ssl_context, max_retries=retry_strategy)
-    else:
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-    
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    
-    # Modernized headers to mimic a real Chromium browser and bypass basic WAFs
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Sec-Ch-Ua': '"Chromium";v="122", "Not(A:Brand";v="24", "Google Chrome";v="122"',
-        'Sec-Ch-Ua-Mobile': '?0',
-        'Sec-Ch-Ua-Platform': '"Windows"',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Sec-Fetch-User': '?1',
-        'Upgrade-Insecure-Requests': '1',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-    })
-    
-    return session
-
 
 def is_valid_url_format(url):
     """Quick URL format validation."""
@@ -95,40 +39,100 @@ def is_valid_url_format(url):
         return False
 
 
-def is_valid_url(url):
-    """Check if URL is accessible, handling SSL and timeouts intelligently."""
+# Per-host knowledge from validation and fetching: netloc (host[:port]) -> (status, recorded_at)
+HOST_OK, HOST_SSL_BYPASS, HOST_BROWSER_REQUIRED = "ok", "ssl_bypass", "browser_required"
+_host_status = {}
+_host_status_lock = threading.Lock()
+
+
+def get_host_status(url):
+    """Cached status of the URL's host (ok / ssl_bypass / browser_required), or None if unknown or expired."""
+    host = urlparse(url).netloc.lower()
+    with _host_status_lock:
+        status, recorded_at = _host_status.get(host, (None, 0))
+    if status and time.time() - recorded_at > _load_config().get("host_cache_ttl", 1800):
+        return None
+    return status
+
+
+def record_host_status(url, status):
+    host = urlparse(url).netloc.lower()
+    if host:
+        with _host_status_lock:
+            _host_status[host] = (status, time.time())
+
+
+def _is_browser_challenge(response):
+    """403/503 answers from bot-protection front ends that a real browser usually gets past."""
+    if response.status_code not in (403, 429, 503):
+        return False
+    server = response.headers.get('server', '').lower()
+    return ('cloudflare' in server or 'cf-mitigated' in response.headers
+            or 'ddos-guard' in server or 'x-sucuri-id' in response.headers)
+
+
+def _check_url(url):
+    """Validates one URL over the shared session, recording what was learned about its host."""
     if not is_valid_url_format(url):
         return False, "Invalid URL format"
-        
+
+    verify_ssl = get_host_status(url) != HOST_SSL_BYPASS
     try:
-        session = create_session_with_retries(retries=1, verify_ssl=True)
-        response = session.head(url, timeout=10, allow_redirects=True)
-        
-        if response.status_code >= 400:
-            return False, f"HTTP {response.status_code} error"
-        return True, "Valid"
-        
-    except (requests.exceptions.SSLError, ssl.SSLError):
         try:
-            session = create_session_with_retries(retries=1, verify_ssl=False)
-            response = session.head(url, timeout=10, allow_redirects=True, verify=False)
-            if response.status_code >= 400:
-                return False, f"HTTP {response.status_code} error"
-            return True, "Valid (SSL bypassed)"
-        except Exception as e:
-            return False, f"SSL bypass failed: {e}"
-            
+            response = http_client.head(url, verify_ssl=verify_ssl, timeout=10)
+        except (requests.exceptions.SSLError, ssl.SSLError):
+            if not verify_ssl:
+                raise
+            verify_ssl = False
+            response = http_client.head(url, verify_ssl=False, timeout=10)
+        if response.status_code in (405, 501):
+            # Some servers refuse HEAD; a streamed GET only reads the headers
+            response = http_client.get(url, verify_ssl=verify_ssl, timeout=10, stream=True)
+            response.close()
+    except (requests.exceptions.SSLError, ssl.SSLError) as e:
+        return False, f"SSL bypass failed: {e}"
     except requests.exceptions.ConnectionError:
+        # Refused/unresolvable: a browser would not get through either, so nothing is recorded
         return False, "Connection failed - site may be down or requires Javascript/Browser"
     except requests.exceptions.Timeout:
+        record_host_status(url, HOST_BROWSER_REQUIRED)
         return False, "Connection timeout - will require Browser rendering"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
+    if _is_browser_challenge(response):
+        record_host_status(url, HOST_BROWSER_REQUIRED)
+        return True, "Valid (bot protection - will use Browser rendering)"
+    if response.status_code >= 400:
+        return False, f"HTTP {response.status_code} error"
+    record_host_status(url, HOST_OK if verify_ssl else HOST_SSL_BYPASS)
+    return True, "Valid" if verify_ssl else "Valid (SSL bypassed)"
+
+
+def validate_urls(urls, max_workers=8):
+    """
+    Checks every URL concurrently over the pooled session.
+    Returns one (is_valid, message) tuple per URL, in input order.
+    """
+    if not urls:
+        return []
+    get_host_limiter(_load_config())
+    results = [None] * len(urls)
+    order = interleave_by_host(urls)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        for index, result in zip(order, executor.map(_check_url, [urls[i] for i in order])):
+            results[index] = result
+    return results
+
+
+def is_valid_url(url):
+    """Check if URL is accessible, handling SSL and timeouts intelligently."""
+    return validate_urls([url])[0]
+
 
 def get_urls():
-    """Interactive URL gatherer."""
-    urls = []
+    """Interactive URL gatherer. URLs are validated together once input is finished."""
+    candidates = []
     print("Enter URLs to scrape. Type 'done' when finished.")
     
     while True:
@@ -142,15 +146,17 @@ def get_urls():
         if not is_valid_url_format(url):
             print(f"✗ Invalid URL format: {url}")
             continue
-        
-        print(f"Validating {url}...")
-        is_valid, message = is_valid_url(url)
-        
+        candidates.append(url)
+
+    if candidates:
+        print(f"Validating {len(candidates)} URLs...")
+    urls = []
+    for url, (is_valid, message) in zip(candidates, validate_urls(candidates)):
         if is_valid:
             urls.append(url)
-            print(f"✓ Added: {url}")
+            print(f"✓ Added: {url}" + (f" ({message})" if message != "Valid" else ""))
         else:
-            print(f"⚠ {message}")
+            print(f"⚠ {url}: {message}")
             force = input("Add anyway? Site might strictly require a real browser (y/N): ").lower().strip()
             if force in ['y', 'yes', '1']:
                 urls.append(url)
@@ -159,340 +165,505 @@ def get_urls():
     return urls
 
 
-def clean_and_format_text(soup):
+def _load_config():
+    return config_manager.load_config() if hasattr(config_manager, 'load_config') else {}
+
+
+def fetch_html(url, verify_ssl=True, use_cache=True):
     """
-    Advanced Readability-based Content Extractor and Markdown Generator.
-    Drastically improved to ignore noise and perfectly format tables/lists.
+    Downloads a page over the shared session, retrying once without SSL verification.
+    Returns the raw body, or None for non-HTML responses. Network errors propagate, as
+    does ValueError for bodies over 'max_page_mb' or that turn out not to be text.
+
+    Goes through the on-disk page cache: fresh entries skip the network, stale ones
+    are revalidated with a conditional GET. use_cache=False bypasses it entirely.
     """
-    # 1. Clean out completely irrelevant DOM elements
-    for element in soup(['script', 'style', 'noscript', 'meta', 'link', 'iframe', 'svg', 
-                         'canvas', 'form', 'nav', 'footer', 'aside', 'header', 'button', 'input']):
-        element.decompose()
+    cache = get_page_cache(_load_config()) if use_cache else None
+    entry = cache.get(url) if cache else None
+    if entry and cache.is_fresh(entry):
+        return entry['body']
+    if verify_ssl and get_host_status(url) == HOST_SSL_BYPASS:
+        # Known from an earlier validation or fetch; skip the failing verified attempt
+        verify_ssl = False
+
+    try:
+        response = http_client.get(url, verify_ssl=verify_ssl, timeout=20, stream=True,
+                                   headers=cache.validators(entry) if entry else None)
+    except (requests.exceptions.SSLError, ssl.SSLError):
+        if verify_ssl:
+            body = fetch_html(url, verify_ssl=False, use_cache=use_cache)
+            record_host_status(url, HOST_SSL_BYPASS)
+            return body
+        raise
+
+    if response.status_code == 304 and entry:
+        response.close()
+        cache.mark_validated(url)
+        return entry['body']
+    if response.status_code >= 400:
+        response.close()
+    response.raise_for_status()
     
-    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-        comment.extract()
-        
-    # ATUALIZAÇÃO: Adicionado filtros agressivos para caixas de navegação de Wikis
-    for selector in[
-        ".comment", "#comments", ".advertisement", ".sidebar", ".menu", ".cookie-banner",
-        ".navbox", ".infobox", ".metadata", ".toc", "#toc",
-        "table[class*='navbox']", "div[class*='navbox']", "table[class*='infobox']"
-    ]:
-        for el in soup.select(selector):
-            el.decompose()
-
-    # 2. Heuristic Content Detection
-    main_content = None
-    for selector in ['article', 'main', '[role="main"]', '#main-content', '.main-content']:
-        main_content = soup.select_one(selector)
-        if main_content: break
-        
-    if not main_content:
-        candidates = soup.find_all(['div', 'section'])
-        best_candidate = soup.body if soup.body else soup
-        highest_score = -1
-        
-        for candidate in candidates:
-            p_tags = candidate.find_all('p')
-            score = len(p_tags)
-            class_id_text = (candidate.get('class', [''])[0] + " " + candidate.get('id', '')).lower()
-            if any(bad in class_id_text for bad in['wrap', 'page', 'container', 'body']):
-                score -= 2
-                
-            if score > highest_score and score > 2:
-                highest_score = score
-                best_candidate = candidate
-                
-        main_content = best_candidate
+    content_type = response.headers.get('content-type', '').lower()
+    if 'text/html' not in content_type and 'text/plain' not in content_type:
+        response.close()
+        return None
+    # Bounded read: a mislabeled download or endless stream aborts with ValueError
+    max_bytes = int(_load_config().get("max_page_mb", 10) * 1024 * 1024)
+    body = http_client.read_limited(response, max_bytes, accept=('text/',))
+    if cache:
+        cache.put(url, body, response.headers)
+    return body
 
-    # 3. Robust HTML to Markdown recursive parser
-    def to_markdown(node, list_depth=0):
-        if isinstance(node, NavigableString):
-            text = str(node)
-            return re.sub(r'\s+', ' ', text)
-            
-        if not isinstance(node, Tag):
-            return ""
-            
-        tag = node.name
-        children_md = "".join(to_markdown(c, list_depth) for c in node.children)
-        
-        # Block Elements
-        if tag in['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            level = tag[1]
-            return f"\n\n{'#' * int(level)} {children_md.strip()}\n\n"
-            
-        elif tag == 'p':
-            return f"\n\n{children_md.strip()}\n\n"
-            
-        elif tag in ['ul', 'ol']:
-            return f"\n{children_md}\n"
-            
-        elif tag == 'li':
-            indent = "  " * list_depth
-            prefix = "- " if node.parent and node.parent.name == 'ul' else "1. "
-            inner = "".join(to_markdown(c, list_depth + 1) for c in node.children).strip()
-            return f"\n{indent}{prefix}{inner}"
-            
-        elif tag == 'blockquote':
-            return "\n\n" + "\n".join(f"> {line}" for line in children_md.strip().split("\n")) + "\n\n"
-            
-        elif tag in ['pre', 'code']:
-            if tag == 'code' and node.parent.name != 'pre':
-                return f"`{children_md.strip()}`"
-            text = node.get_text()
-            return f"\n\n```\n{text}\n```\n\n"
-            
-        # ATUALIZAÇÃO: Lógica de Tabelas (GitHub Flavored Markdown) aprimorada
-        elif tag == 'table':
-            # Se for uma tabela DENTRO de outra tabela, o Markdown quebra. 
-            # Então nós a tratamos apenas como texto plano.
-            if node.find_parent('table'):
-                return f" {children_md.strip()} "
-
-            # Pega apenas as linhas que pertencem DIRETAMENTE a esta tabela (ignora tabelas filhas)
-            rows =[]
-            for child in node.children:
-                if child.name in ['thead', 'tbody', 'tfoot']:
-                    rows.extend(child.find_all('tr', recursive=False))
-                elif child.name == 'tr':
-                    rows.append(child)
-                    
-            if not rows: return ""
-            
-            table_md = "\n\n"
-            valid_rows = 0
-            
-            for i, row in enumerate(rows):
-                # Pega apenas as células diretas (evita vazamento de tabelas aninhadas)
-                cells = row.find_all(['td', 'th'], recursive=False)
-                if not cells: continue
-                
-                # O Markdown NÃO permite quebras de linha dentro de uma célula da tabela
-                # O strip() e split() transformam quebras de linha em espaços
-                cell_text =[" ".join(to_markdown(c).strip().split()) for c in cells]
-                table_md += "| " + " | ".join(cell_text) + " |\n"
-                
-                # Adiciona a linha de separação após a primeira linha
-                if valid_rows == 0:
-                    table_md += "| " + " | ".join(["---"] * len(cells)) + " |\n"
-                
-                valid_rows += 1
-            
-            return table_md + "\n"
 
-        # Inline Elements
-        elif tag in ['strong', 'b']:
-            return f" **{children_md.strip()}** "
-            
-        elif tag in ['em', 'i']:
-            return f" *{children_md.strip()}* "
-            
-        elif tag == 'a':
-            href = node.get('href', '')
-            text = children_md.strip()
-            if not text: return ""
-            if href.startswith('http'):
-                return f" [{text}]({href}) "
-            return f" [{text}] "
-            
-        elif tag in ['br', 'hr']:
-            return "\n" if tag == 'br' else "\n\n---\n\n"
-            
-        else:
-            return children_md
+def _cached_rendered_page(cache, url):
+    """Browser-rendered HTML from the page cache when still valid, else None."""
+    entry = cache.get(url, variant='rendered')
+    if not entry:
+        return None
+    if cache.is_fresh(entry):
+        return entry['body']
 
-    # Process and cleanup final Markdown
-    raw_md = to_markdown(main_content)
-    
-    # Cleanup regexes
-    cleaned_md = re.sub(r'\n{3,}', '\n\n', raw_md)          # Max 2 newlines
-    cleaned_md = re.sub(r' +(\n|$)', r'\1', cleaned_md)     # Trailing spaces
-    cleaned_md = re.sub(r'( \*\*|\*\* )', '**', cleaned_md) # Bold spacing
-    cleaned_md = re.sub(r'( \*|\* )', '*', cleaned_md)      # Italic spacing
-    # Remove pipes vazios excessivos que sobram de tabelas complexas
-    cleaned_md = re.sub(r'\|\s+\|\s+\|', '| |', cleaned_md) 
-    
-    return cleaned_md.strip()
+    # Rendered entries carry the validators of the plain HTTP response, if we had one
+    validators = cache.validators(entry)
+    if validators:
+        try:
+            response = http_client.head(url, headers=validators, timeout=10)
+            if response.status_code == 304:
+                cache.mark_validated(url, variant='rendered')
+                return entry['body']
+        except Exception:
+            pass
+    return None
 
 
-def scrape_with_requests(url, verify_ssl=True):
+def scrape_with_requests(url, verify_ssl=True, use_cache=True):
     """Scrapes URL using requests. Optimized for speed and encoding fallbacks."""
     try:
-        session = create_session_with_retries(retries=2, verify_ssl=verify_ssl)
-        response = session.get(url, timeout=20, verify=verify_ssl)
-        response.raise_for_status()
-        
-        content_type = response.headers.get('content-type', '').lower()
-        if 'text/html' not in content_type and 'text/plain' not in content_type:
+        html = fetch_html(url, verify_ssl=verify_ssl, use_cache=use_cache)
+        if html is None:
             return None, None, False
             
-        # Let BeautifulSoup handle charset parsing from response.content natively
-        soup = BeautifulSoup(response.content, 'html.parser')
-        page_title = soup.title.string.strip() if soup.title and soup.title.string else "Untitled Page"
-        
-        formatted_text = clean_and_format_text(soup)
+        formatted_text, page_title = html_to_markdown(html)
         
         if formatted_text and len(formatted_text.strip()) > 50:
             return formatted_text, page_title, True
         return None, None, False
         
-    except (requests.exceptions.SSLError, ssl.SSLError):
-        if verify_ssl:
-            return scrape_with_requests(url, verify_ssl=False)
-        return None, None, False
     except Exception:
         return None, None, False
 
 
-def scrape_with_selenium(urls, use_requests_fallback=True):
+# Markers of pages that only render (or only pass an anti-bot check) with a real browser.
+# Raw markers are matched against the HTML, text markers against the extracted text/title.
+JS_REQUIRED_RAW_MARKERS = [
+    'cf-browser-verification', '_cf_chl_opt', 'cf-chl-', 'ddos-guard', 'sucuri_cloudproxy',
+    'id="__next"></div>', '<div id="root"></div>', '<div id="app"></div>',
+]
+JS_REQUIRED_TEXT_MARKERS = [
+    'just a moment...', 'checking your browser', 'enable javascript', 'javascript is disabled',
+    'please enable cookies', 'loading page resources.', "the site isn't loading",
+    'verify you are human', 'access denied',
+]
+
+
+def _mediawiki_tier(url, min_chars, use_cache=True, config=None):
+    """(formatted_text, page_title) from the MediaWiki API when it serves enough text, else None."""
+    config = config if config is not None else _load_config()
+    if not config.get("mediawiki_api", True) or not is_mediawiki_url(url):
+        return None
+    try:
+        formatted_text, page_title = scrape_mediawiki(url, use_cache, config)
+    except Exception:
+        return None
+    formatted_text = (formatted_text or "").strip()
+    if len(formatted_text) < min_chars:
+        return None
+    return formatted_text, page_title
+
+
+def _has_fresh_page(url, use_cache=True):
+    cache = get_page_cache(_load_config()) if use_cache else None
+    entry = cache.get(url) if cache else None
+    return bool(entry and cache.is_fresh(entry))
+
+
+# Reason given when plain HTTP is skipped for a host that needed a browser recently;
+# no request was made, so it says nothing about how the engine does on the host
+BROWSER_REQUIRED_SKIP = "host requires a browser (cached)"
+
+
+def _requests_tier(url, min_chars, use_cache=True, browser_fallback=True):
     """
-    Drastically improved Selenium implementation. 
-    Uses Selenium 4 built-in manager (NO MORE hardcoded executable_paths).
-    Incorporates advanced stealth mechanisms to bypass bot protection.
+    Plain HTTP attempt. Returns (formatted_text, page_title, failure_reason); failure_reason
+    is None when the result is good enough. Hosts already known to need a browser fail
+    without a request, unless the page cache still holds a fresh copy or no browser engine
+    comes after this one (browser_fallback=False).
+    """
+    if (browser_fallback and get_host_status(url) == HOST_BROWSER_REQUIRED
+            and not _has_fresh_page(url, use_cache)):
+        return None, None, BROWSER_REQUIRED_SKIP
+    try:
+        html = fetch_html(url, use_cache=use_cache)
+    except requests.exceptions.HTTPError as e:
+        if _is_browser_challenge(e.response):
+            record_host_status(url, HOST_BROWSER_REQUIRED)
+        return None, None, f"request failed ({type(e).__name__})"
+    except requests.exceptions.Timeout as e:
+        record_host_status(url, HOST_BROWSER_REQUIRED)
+        return None, None, f"request failed ({type(e).__name__})"
+    except Exception as e:
+        return None, None, f"request failed ({type(e).__name__})"
+    if html is None:
+        return None, None, "non-HTML response"
+
+    try:
+        formatted_text, page_title = html_to_markdown(html)
+    except Exception as e:
+        return None, None, f"cleaning failed ({type(e).__name__})"
+    formatted_text = (formatted_text or "").strip()
+    if len(formatted_text) >= min_chars:
+        # Enough text came out; markers in scripts or prose don't matter then
+        return formatted_text, page_title, None
+
+    # Only this page escalates: host-wide status is left to real challenge responses above
+    raw_head = html[:200000].decode('utf-8', errors='ignore').lower()
+    if any(marker in raw_head for marker in JS_REQUIRED_RAW_MARKERS):
+        return None, None, "anti-bot/JS shell detected"
+    probe = f"{page_title}\n{formatted_text[:3000]}".lower()
+    if any(marker in probe for marker in JS_REQUIRED_TEXT_MARKERS):
+        return formatted_text, page_title, "page asks for JavaScript"
+    return formatted_text, page_title, f"content too short ({len(formatted_text)} chars)"
+
+
+def _page_result(url, index, title=None, markdown=None, engine=None, elapsed=0.0, error=None):
+    return {"url": url, "index": index, "title": title, "markdown": markdown,
+            "engine": engine, "elapsed": round(elapsed, 2), "error": error}
+
+
+def _timed(fn, *args):
+    started = time.time()
+    return fn(*args), time.time() - started
+
+
+def _iter_http(urls, indices, attempt, engine_name, label):
+    """Runs attempt(url) -> (text, title, reason) concurrently, spread across hosts, yielding result dicts."""
+    with ThreadPoolExecutor(max_workers=min(8, len(urls))) as executor:
+        # Submit round-robin across hosts so per-host limits never leave workers idle behind one wiki
+        futures = {executor.submit(_timed, attempt, urls[position]): position for position in interleave_by_host(urls)}
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                (text, title, reason), elapsed = future.result()
+            except Exception as e:
+                # One bad page must not take the rest of the job down with it
+                yield _page_result(urls[position], indices[position], engine=engine_name, error=f"{label} attempt failed: {e}")
+                continue
+            if reason is None:
+                print(f"✓ Scraped ({label}): {urls[position]}")
+                yield _page_result(urls[position], indices[position], title, text, engine_name, elapsed)
+                continue
+            page = _page_result(urls[position], indices[position], title, None, engine_name, elapsed, reason)
+            if text and len(text) > 50 and reason.startswith("content too short"):
+                page["partial"] = (title, text)
+            yield page
+
+
+class MediaWikiEngine(ScraperEngine):
+    """Article HTML straight from api.php (no ads, skins or anti-bot pages)."""
+    name = "mediawiki"
+
+    def supports(self, url, config):
+        return config.get("mediawiki_api", True) and is_mediawiki_url(url)
+
+    def iter_pages(self, urls, indices, context):
+        def attempt(url):
+            result = _mediawiki_tier(url, context["min_chars"], context["use_cache"], context["config"])
+            return (result[0], result[1], None) if result else (None, None, "no usable API result")
+        yield from _iter_http(urls, indices, attempt, self.name, "MediaWiki API")
+
+
+class RequestsEngine(ScraperEngine):
+    """Plain HTTP fetch over the shared session; fails on JS shells and too-short pages."""
+    name = "requests"
+
+    def iter_pages(self, urls, indices, context):
+        def attempt(url):
+            return _requests_tier(url, context["min_chars"], context["use_cache"],
+                                  url in context["browser_fallback"])
+        for page in _iter_http(urls, indices, attempt, self.name, "HTTP"):
+            if page["error"] == BROWSER_REQUIRED_SKIP:
+                page["skipped"] = True
+            yield page
+
+
+class SeleniumEngine(ScraperEngine):
+    """Pooled Selenium browsers (see iter_selenium)."""
+    name = "selenium"
+    exclusive = True
+    browser = True
+
+    def iter_pages(self, urls, indices, context):
+        yield from self.iter_feed(_prefilled_feed(urls, indices), context)
+
+    def iter_feed(self, feed, context):
+        yield from iter_selenium(None, use_requests_fallback=False, use_cache=context["use_cache"], feed=feed)
+
+
+class Crawl4aiEngine(ScraperEngine):
+    """The long-lived crawl4ai service (see iter_crawl4ai)."""
+    name = "crawl4ai"
+    exclusive = True
+    browser = True
+
+    def is_available(self, config):
+        return is_crawl4ai_available()
+
+    def iter_pages(self, urls, indices, context):
+        yield from iter_crawl4ai(urls, headless=context["headless"], indices=indices)
+
+    def iter_feed(self, feed, context):
+        yield from iter_crawl4ai(None, headless=context["headless"], feed=feed)
+
+
+for _engine in (MediaWikiEngine(), RequestsEngine(), SeleniumEngine(), Crawl4aiEngine()):
+    register_engine(_engine)
+
+
+def default_engine_order(engine="legacy", tiered=True, config=None):
+    """
+    Engine names to try for a URL with no history, cheapest first. 'scraper_engine_order'
+    in config overrides it; unknown and unavailable engines are dropped.
+    """
+    config = config if config is not None else _load_config()
+    order = config.get("scraper_engine_order")
+    if not order:
+        browsers = ["crawl4ai", "selenium"] if engine == "crawl4ai" else ["selenium"]
+        order = ["mediawiki", "requests"] + browsers if tiered else ["mediawiki"] + browsers + ["requests"]
+    names = []
+    for name in order:
+        if name in ENGINES and ENGINES[name].is_available(config):
+            names.append(name)
+        elif name == "crawl4ai":
+            print("crawl4ai is not installed, falling back to legacy scraper.")
+    return names
+
+
+def iter_scrape(urls, engine="legacy", headless=True, min_chars=None, use_cache=True, tiered=True):
+    """
+    Yields one result dict per URL as soon as that URL is done (completion order, not input order):
+    url, index (position in urls), title, markdown (None on failure), engine
+    ('mediawiki' / 'requests' / 'cache' / 'selenium' / 'crawl4ai'), elapsed seconds and error.
+
+    Each URL walks a chain of registered engines until one succeeds, moving to its next
+    engine as soon as one fails; batches of different engines run at the same time, while
+    exclusive (browser) engines take one batch at a time. With tiered=True the
+    chain starts with the MediaWiki API and plain HTTP, then the browser engine (crawl4ai
+    when selected, Selenium otherwise); tiered=False puts the browser first. Engine stats
+    (see engines.EngineStats) reorder each chain so the engine that has been fastest and
+    reliable on the URL's host goes first, and engines that keep failing there go last;
+    cheaper engines still get re-tried on some URLs so a host can win them back.
     """
     if not urls:
-        print("No URLs provided for scraping.")
-        return ""
-    
-    all_text = ""
-    driver = None
-    config = config_manager.load_config() if hasattr(config_manager, 'load_config') else {}
-    browser_cfg = config.get("browser_config", {})
-    preferred_browser = browser_cfg.get("browser_name", "Chrome")
-
-    def get_stealth_chrome_options(is_edge=False):
-        options = EdgeOptions() if is_edge else ChromeOptions()
-        options.add_argument('--headless=new')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
-        options.add_experimental_option('excludeSwitches', ['enable-automation', 'enable-logging'])
-        options.add_experimental_option('useAutomationExtension', False)
-        # Ignore security errors to ensure page loads successfully
-        options.add_argument('--ignore-certificate-errors')
-        options.add_argument('--allow-running-insecure-content')
-        options.add_argument('--log-level=3') 
-        options.add_argument('--silent')
-        return options
-
-    # Browsers to attempt, putting the config-preferred one first
-    browsers = [("Chrome", "chrome"), ("Edge", "edge"), ("Firefox", "firefox")]
-    browsers.sort(key=lambda x: x[0] != preferred_browser)
-
-    for browser_name, browser_type in browsers:
+        return
+    config = _load_config()
+    if min_chars is None:
+        min_chars = config.get("tiered_min_chars", 400)
+    context = {"config": config, "headless": headless, "use_cache": use_cache, "min_chars": min_chars}
+    order = default_engine_order(engine, tiered, config)
+    stats = get_engine_stats(config)
+
+    chains, reported = [], set()
+    for url in urls:
+        candidates = [name for name in order if ENGINES[name].supports(url, config)]
+        chain = stats.rank(url, candidates) if stats else candidates
+        chains.append(chain)
+        host = (urlparse(url).hostname or "").lower()
+        if stats and len(chain) > 1 and stats.is_proven(url, chain[1]) and not stats.is_proven(url, chain[0]):
+            # Periodic re-try of a cheaper engine (see EngineStats.rank); chain[1] takes over if it fails
+            print(f"  ↪ {host}: re-checking {chain[0]} before {chain[1]} for {url}")
+        elif chain and candidates and chain[0] != candidates[0] and host not in reported:
+            reported.add(host)
+            history = stats.get(url, chain[0])
+            if history:
+                print(f"  ↪ {host}: trying {chain[0]} first ({stats.reliability(history):.0%} success, "
+                      f"{history['latency']:.1f}s per page so far)")
+            else:
+                # Promoted only because the engines ahead of it keep failing here
+                print(f"  ↪ {host}: trying {chain[0]} first ({candidates[0]} keeps failing on this host)")
+
+    # URLs with a browser engine after plain HTTP in their chain; the rest always get a real request
+    context["browser_fallback"] = {
+        url for url, chain in zip(urls, chains) if "requests" in chain
+        and any(ENGINES[name].browser for name in chain[chain.index("requests") + 1:])}
+
+    print(f"Scraping {len(urls)} URLs ({' → '.join(order)}, reordered per host by past results)...")
+    get_host_limiter(config)
+    elapsed = [0.0] * len(urls)
+    steps = [0] * len(urls)
+    partial, errors = {}, {}
+    # Every engine batch runs on its own thread and reports here, so a URL moves on to its
+    # next engine as soon as it fails instead of waiting for unrelated engine groups.
+    # Exclusive engines get one open batch (a UrlFeed) that later URLs are added to.
+    events = queue.Queue()
+    moved, feeds, fed = {}, {}, set()
+    # index -> (engine, seconds) of a short extraction not yet recorded in the engine stats
+    pending_records = {}
+
+    def run_batch(name, indices=None, feed=None):
+        reported = set()
         try:
-            print(f"Setting up {browser_name} via Selenium 4 Auto-Manager...")
-            
-            if browser_type == "chrome":
-                driver = webdriver.Chrome(options=get_stealth_chrome_options(is_edge=False))
-            elif browser_type == "edge":
-                driver = webdriver.Edge(options=get_stealth_chrome_options(is_edge=True))
-            elif browser_type == "firefox":
-                options = FirefoxOptions()
-                options.add_argument('--headless')
-                driver = webdriver.Firefox(options=options)
-
-            if driver:
-                print(f"✓ {browser_name} initialized successfully.")
-                
-                # Apply anti-bot stealth scripts via CDP
-                if browser_type in ["chrome", "edge"]:
-                    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                        "source": """
-                            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                            window.navigator.chrome = {runtime: {}};
-                        """
-                    })
-                
-                # Save working browser to config
-                if browser_name != preferred_browser and hasattr(config_manager, 'save_config'):
-                    config["browser_config"] = {"browser_name": browser_name, "browser_type": browser_type}
-                    config_manager.save_config(config)
-                    
-                driver.set_page_load_timeout(45)
-                break
-                
+            if feed is not None:
+                pages = ENGINES[name].iter_feed(feed, context)
+            else:
+                pages = ENGINES[name].iter_pages([urls[i] for i in indices], indices, context)
+            for page in pages:
+                reported.add(page["index"])
+                events.put(("page", name, page))
         except Exception as e:
-            # Silently fail and try the next browser
-            driver = None
-            continue
+            print(f"⚠ {name} engine failed: {e}")
+            taken = [index for _, index in feed.taken] if feed is not None else indices
+            for index in taken:
+                if index not in reported:
+                    events.put(("page", name, _page_result(urls[index], index, engine=name, error=f"{name} engine failed: {e}")))
+        finally:
+            events.put(("done", name, feed))
 
-    if not driver:
-        print("⚠ All browsers failed to initialize. Falling back to Requests engine.")
-    
+    def launch(name, indices):
+        if steps[indices[0]]:
+            print(f"  → Trying {name} for {len(indices)} remaining URL(s)...")
+        if not ENGINES[name].exclusive:
+            threading.Thread(target=run_batch, args=(name, indices), daemon=True).start()
+            return
+        feed = feeds.get(name)
+        if feed is None:
+            feed = feeds[name] = UrlFeed(len(urls))
+            threading.Thread(target=run_batch, args=(name, None, feed), daemon=True).start()
+        for index in indices:
+            fed.add((name, index))
+            feed.add(urls[index], index)
+
+    def close_idle_feeds():
+        # A feed stays open while any unfinished URL may still reach its engine
+        for name, feed in feeds.items():
+            if not feed.closed and not any(not done[i] and (name, i) not in fed and name in chains[i][steps[i]:]
+                                           for i in range(len(urls))):
+                feed.close()
+
+    def finish(index):
+        done[index] = True
+        if index in partial:
+            # No engine did better; keep the short HTTP extraction
+            print(f"  ↩ Kept short HTTP extraction for {urls[index]}")
+            title, text = partial[index]
+            if stats and index in pending_records:
+                name, page_elapsed = pending_records.pop(index)
+                stats.record(urls[index], name, True, len(text), page_elapsed)
+            return _page_result(urls[index], index, title, text, "requests", elapsed[index])
+        print(f"✗ Failed: {urls[index]} - {errors.get(index, 'no engine could scrape it')}")
+        return _page_result(urls[index], index, elapsed=elapsed[index],
+                            error=errors.get(index, "No readable content extracted"))
+
+    def handle(name, page):
+        """Records one engine result; yields the URL's final result once it has one."""
+        index = page["index"]
+        elapsed[index] += page["elapsed"]
+        if page.get("partial") and index not in partial:
+            # Whether a short extraction failed is only known once later engines have had a go
+            pending_records[index] = (name, page["elapsed"])
+        elif stats and page["engine"] != "cache" and not page.get("skipped"):
+            stats.record(urls[index], name, bool(page["markdown"]), len(page["markdown"] or ""), page["elapsed"])
+        if page["markdown"] and stats and index in pending_records:
+            # A later engine did better, so the short extraction counts as a miss
+            failed_name, failed_elapsed = pending_records.pop(index)
+            stats.record(urls[index], failed_name, False, 0, failed_elapsed)
+        if page["markdown"]:
+            done[index] = True
+            page["elapsed"] = round(elapsed[index], 2)
+            yield page
+            return
+        if page.get("partial"):
+            partial.setdefault(index, page["partial"])
+        errors[index] = page["error"] or "No readable content extracted"
+        steps[index] += 1
+        chain = chains[index]
+        if steps[index] < len(chain):
+            print(f"  → {urls[index]}: {errors[index]} ({name}). Trying {chain[steps[index]]}.")
+            moved.setdefault(chain[steps[index]], []).append(index)
+        else:
+            yield finish(index)
+
+    done = [False] * len(urls)
+    try:
+        groups = {}
+        for index, chain in enumerate(chains):
+            if chain:
+                groups.setdefault(chain[0], []).append(index)
+            else:
+                yield finish(index)
+        for name in sorted(groups, key=order.index):
+            launch(name, groups[name])
+        close_idle_feeds()
+
+        while not all(done):
+            if moved and events.empty():
+                # Failures that arrived together go to their next engine as one batch
+                for name in sorted(moved, key=order.index):
+                    launch(name, moved[name])
+                moved.clear()
+                close_idle_feeds()
+            kind, name, payload = events.get()
+            if kind == "done":
+                if payload is not None and feeds.get(name) is payload:
+                    del feeds[name]
+                    # The batch stopped early: whatever it never took fails over to the next engine
+                    for url, index in payload.drain():
+                        yield from handle(name, _page_result(url, index, engine=name, error=f"{name} stopped before loading it"))
+                continue
+            yield from handle(name, payload)
+            close_idle_feeds()
+    finally:
+        if stats:
+            stats.save()
+
+
+def collect_page_results(pages, total_urls):
+    """Orders streamed result dicts back into input order: (title, markdown) or None per URL."""
+    results = [None] * total_urls
+    for page in pages:
+        if page["markdown"]:
+            results[page["index"]] = (page["title"], page["markdown"])
+    return results
+
+
+def scrape_tiered(urls, engine="legacy", headless=True, min_chars=None, use_cache=True, tiered=True):
+    """
+    Scrapes every URL through its engine chain (see iter_scrape), joined into the
+    Markdown document sent to the AI once every URL is done.
+    """
+    if not urls:
+        print("No URLs provided for scraping.")
+        return ""
+    pages = iter_scrape(urls, engine=engine, headless=headless, min_chars=min_chars, use_cache=use_cache, tiered=tiered)
+    return format_page_results(collect_page_results(pages, len(urls)), len(urls))
+
+
+def format_page_results(results, total_urls):
+    """Joins (title, text) page results into the Markdown document sent to the AI."""
+    all_text = ""
     successful_scrapes = 0
-    total_urls = len(urls)
-    
-    for i, url in enumerate(urls, 1):
-        scraped = False
-        formatted_text = None
-        page_title = "Untitled Page"
-        
-        if driver:
-            try:
-                print(f"[{i}/{total_urls}] Loading {url} with Selenium...")
-                driver.get(url)
-                
-                # Smart dynamic wait - wait until network is mostly idle or body loads
-                WebDriverWait(driver, 15).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
-                # Scroll to trigger lazy-loaded text/images
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-                time.sleep(1.5) 
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
-                
-                page_source = driver.page_source
-                page_title = driver.title or "Untitled Page"
-                
-                if page_source and len(page_source) > 500:
-                    soup = BeautifulSoup(page_source, 'html.parser')
-                    formatted_text = clean_and_format_text(soup)
-                    
-                    if formatted_text and len(formatted_text.strip()) > 50:
-                        scraped = True
-                        print(f"  ✓ Selenium extraction successful")
-                    else:
-                        print(f"  ⚠ Extracted content was too short. Trying fallback.")
-                        
-            except TimeoutException:
-                print(f"  ⚠ Page load timeout.")
-            except WebDriverException as e:
-                print(f"  ⚠ Selenium Navigation Error: {str(e).splitlines()[0]}")
-            except Exception as e:
-                print(f"  ⚠ Unexpected Selenium Error: {e}")
-        
-        # Fallback to requests if Selenium didn't work or content was blocked
-        if not scraped and use_requests_fallback:
-            print(f"  → Attempting Requests-based extraction for {url}...")
-            content, req_title, success = scrape_with_requests(url)
-            if success and content:
-                formatted_text = content
-                page_title = req_title
-                scraped = True
-                print(f"  ✓ Requests extraction successful")
-        
-        if scraped and formatted_text:
+    for result in results:
+        if result:
+            page_title, formatted_text = result
             all_text += f"\n# {page_title}\n\n{formatted_text}\n\n---\n"
             successful_scrapes += 1
-            print(f"✓ Scraped: {url}")
-        else:
-            print(f"✗ Failed: {url} - No readable content extracted")
-            
-    if driver:
-        try:
-            driver.quit()
-        except:
-            pass
             
     print(f"\n{'='*50}")
     print(f"Scraping complete: {successful_scrapes}/{total_urls} URLs successful")
+    for host, stats in get_host_stats().items():
+        if stats['throttled'] or stats['waited'] >= 1:
+            print(f"  {host}: {stats['requests']} requests, {stats['throttled']} rate-limited, "
+                  f"{stats['waited']:.1f}s spent waiting for politeness limits")
     
     if not all_text.strip():
         print("⚠ Warning: No content was scraped from any URLs")
@@ -500,6 +671,341 @@ def scrape_with_selenium(urls, use_requests_fallback=True):
     return all_text
 
 
+# Adaptive readiness: a page is ready once its main-content text length has been stable for
+# text_stable_ms, or sooner if the DOM has also stopped mutating for quiet_ms; capped at
+# max_wait seconds, no more than the fixed sleeps this replaced. Mutations inside ads,
+# iframes, players and scripts are ignored, since on ad-heavy pages they never stop.
+# Per-domain overrides come from the 'readiness_overrides' config dict, e.g.
+# {"fandom.com": {"quiet_ms": 800}}.
+READINESS_DEFAULTS = {"max_wait": 2.5, "quiet_ms": 300, "text_stable_ms": 500, "poll_interval": 0.1,
+                      "scroll": True, "min_text": 0}
+
+_READINESS_PROBE_JS = """
+const IGNORED = 'iframe, script, style, noscript, ins, video, audio, canvas, svg';
+if (!window.__charmakerReady) {
+    window.__charmakerReady = {last: performance.now()};
+    const ignored = node => {
+        const el = node.nodeType === 1 ? node : node.parentElement;
+        return !el || !!el.closest(IGNORED);
+    };
+    try {
+        new MutationObserver(records => {
+            for (const r of records) {
+                const nodes = Array.from(r.addedNodes).concat(Array.from(r.removedNodes));
+                if (ignored(r.target) || (nodes.length && nodes.every(ignored))) continue;
+                window.__charmakerReady.last = performance.now();
+                return;
+            }
+        }).observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    } catch (e) {}
+}
+const main = document.querySelector('main, article, [role="main"], #mw-content-text') || document.body;
+return [document.readyState, performance.now() - window.__charmakerReady.last,
+        main ? main.textContent.length : 0];
+"""
+
+
+def get_readiness_settings(url, config=None):
+    """READINESS_DEFAULTS merged with the most specific matching 'readiness_overrides' entry."""
+    settings = dict(READINESS_DEFAULTS)
+    overrides = (config or {}).get("readiness_overrides", {})
+    host = (urlparse(url).hostname or "").lower()
+    matches = [domain for domain in overrides if host == domain or host.endswith("." + domain)]
+    if matches:
+        settings.update(overrides[max(matches, key=len)])
+    return settings
+
+
+def wait_for_page_ready(driver, settings):
+    """
+    Polls until the main-content text length is stable (True), or until settings['max_wait']
+    runs out (False). Scrolls once to trigger lazy loading.
+    """
+    deadline = time.time() + settings["max_wait"]
+    scrolled = not settings["scroll"]
+    last_length, stable_since = -1, time.time()
+
+    while True:
+        state, quiet_for, text_length = driver.execute_script(_READINESS_PROBE_JS)
+        changed = text_length != last_length
+        if changed:
+            last_length, stable_since = text_length, time.time()
+        if state != "loading":
+            if not scrolled:
+                # Scroll to trigger lazy-loaded text; the stability window restarts after it
+                driver.execute_script("window.scrollTo(0, document.body ? document.body.scrollHeight : 0);")
+                scrolled, stable_since = True, time.time()
+            else:
+                stable_ms = (time.time() - stable_since) * 1000
+                if text_length >= settings["min_text"] and not changed and (
+                        stable_ms >= settings["text_stable_ms"] or quiet_for >= settings["quiet_ms"]):
+                    return True
+
+        if time.time() >= deadline:
+            return False
+        time.sleep(settings["poll_interval"])
+
+
+_PAGE_METRICS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? (nav.transferSize || nav.encodedBodySize || 0) : 0;
+for (const r of resources) { bytes += r.transferSize || r.encodedBodySize || 0; }
+return [bytes, resources.length, nav ? nav.domContentLoadedEventEnd : 0];
+"""
+
+# (host, profile) -> [pages, total bytes, total seconds], for comparing profiles within a session
+_page_metrics = {}
+_page_metrics_lock = threading.Lock()
+
+
+def collect_page_metrics(driver, started):
+    """
+    Per-page load stats from the Performance API: bytes transferred (cross-origin
+    resources without Timing-Allow-Origin count as 0, so this is a lower bound),
+    resource request count, DOMContentLoaded time and total wall time in seconds.
+    """
+    try:
+        transferred, requests_made, dom_ready_ms = driver.execute_script(_PAGE_METRICS_JS)
+    except Exception:
+        transferred, requests_made, dom_ready_ms = 0, 0, 0
+    return {
+        "bytes": int(transferred or 0),
+        "requests": int(requests_made or 0),
+        "dom_ready": (dom_ready_ms or 0) / 1000,
+        "elapsed": time.time() - started,
+    }
+
+
+def report_page_metrics(url, metrics, profile):
+    """Prints one page's load stats and, once both profiles have loaded this host, the difference."""
+    host = (urlparse(url).hostname or "").lower()
+    with _page_metrics_lock:
+        totals = _page_metrics.setdefault((host, profile), [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += metrics["bytes"]
+        totals[2] += metrics["elapsed"]
+        other = _page_metrics.get((host, "full" if profile == "text-only" else "text-only"))
+
+    line = (f"  ⏱ {metrics['elapsed']:.1f}s ({profile}), {metrics['bytes'] / 1024:.0f} KB "
+            f"over {metrics['requests']} requests, DOM ready at {metrics['dom_ready']:.1f}s")
+    if other and other[0]:
+        full, fast = (other, totals) if profile == "text-only" else (totals, other)
+        saved_kb = (full[1] / full[0] - fast[1] / fast[0]) / 1024
+        saved_s = full[2] / full[0] - fast[2] / fast[0]
+        line += f" | text-only saves ~{saved_kb:.0f} KB and {saved_s:.1f}s per page on {host}"
+    print(line)
+
+
+# How the Selenium path gets the rendered page into Python: the full page_source, or
+# only the main content, pruned and selected inside the browser (BROWSER_EXTRACT_JS)
+EXTRACTION_MODES = ("page_source", "in_browser")
+
+
+def extract_rendered_page(driver, mode="page_source", use_cache=True):
+    """
+    Pulls the loaded page out of the browser and converts it to Markdown. Returns
+    (formatted_text, page_title, html, stats): html is what gets cached as the rendered
+    page; stats has the bytes sent over the WebDriver wire, the wall time of the whole
+    step and the Python CPU time spent in it.
+    """
+    started, cpu_started = time.time(), time.thread_time()
+    if mode == "in_browser":
+        title, main_html, infoboxes = driver.execute_script(BROWSER_EXTRACT_JS)
+        html = wrap_extracted_html(title, main_html, infoboxes or ()) if main_html else ""
+        transferred = len(html.encode('utf-8'))
+        formatted_text, page_title = html_to_markdown(html, use_cache, detect_main=False) if html else (None, None)
+        page_title = title or page_title
+    else:
+        html = driver.page_source or ""
+        page_title = driver.title
+        transferred = len(html.encode('utf-8'))
+        formatted_text = html_to_markdown(html, use_cache)[0] if len(html) > 500 else None
+
+    stats = {
+        "transferred": transferred,
+        "elapsed": time.time() - started,
+        "cpu": time.thread_time() - cpu_started,
+    }
+    return formatted_text, page_title or "Untitled Page", html, stats
+
+
+def _scrape_url_with_driver(driver, url, label, cache=None, readiness=None, profile="full", extraction="page_source"):
+    """Loads a single URL in an initialized driver. Returns (formatted_text, page_title)."""
+    formatted_text = None
+    page_title = "Untitled Page"
+    try:
+        print(f"{label} Loading {url} with Selenium...")
+        started = time.time()
+        with get_host_limiter().slot(url, browser=True):
+            driver.get(url)
+        
+        if not wait_for_page_ready(driver, readiness or READINESS_DEFAULTS):
+            print(f"  ⚠ Page still changing after {time.time() - started:.1f}s; using it as is.")
+        report_page_metrics(url, collect_page_metrics(driver, started), profile)
+        
+        formatted_text, page_title, html, stats = extract_rendered_page(driver, extraction)
+        print(f"  ⚙ {extraction}: {stats['transferred'] / 1024:.0f} KB of HTML sent to Python, "
+              f"{stats['elapsed']:.2f}s ({stats['cpu']:.2f}s Python CPU)")
+
+        if formatted_text and len(formatted_text.strip()) > 50:
+            print(f"  ✓ Selenium extraction successful ({url})")
+            if cache:
+                raw_entry = cache.get(url)
+                cache.put(url, html.encode('utf-8'), raw_entry['headers'] if raw_entry else {}, variant='rendered')
+            return formatted_text, page_title
+        print(f"  ⚠ Extracted content was too short ({url}). Trying fallback.")
+                
+    except TimeoutException:
+        print(f"  ⚠ Page load timeout ({url}).")
+    except WebDriverException as e:
+        print(f"  ⚠ Selenium Navigation Error: {str(e).splitlines()[0]}")
+    except Exception as e:
+        print(f"  ⚠ Unexpected Selenium Error: {e}")
+    return None, page_title
+
+
+def scrape_with_selenium(urls, use_requests_fallback=True, workers=None, use_cache=True):
+    """
+    Drastically improved Selenium implementation. 
+    Uses Selenium 4 built-in manager (NO MORE hardcoded executable_paths).
+    Incorporates advanced stealth mechanisms to bypass bot protection.
+    """
+    if not urls:
+        print("No URLs provided for scraping.")
+        return ""
+
+    results = scrape_pages_with_selenium(urls, use_requests_fallback, workers, use_cache)
+    return format_page_results(results, len(urls))
+
+
+def scrape_pages_with_selenium(urls, use_requests_fallback=True, workers=None, use_cache=True):
+    """Returns one (page_title, formatted_text) tuple per URL, or None where scraping failed."""
+    return collect_page_results(iter_selenium(urls, use_requests_fallback, workers, use_cache), len(urls))
+
+
+def _prefilled_feed(urls, indices=None):
+    """A closed UrlFeed holding urls, round-robin across hosts."""
+    indices = indices or list(range(len(urls)))
+    feed = UrlFeed(len(urls))
+    for position in interleave_by_host(urls):
+        feed.add(urls[position], indices[position])
+    feed.close()
+    return feed
+
+
+def iter_selenium(urls, use_requests_fallback=True, workers=None, use_cache=True, indices=None, feed=None):
+    """
+    Yields a result dict (see iter_scrape) per URL as each one finishes. `indices`
+    gives the index reported for each URL (defaults to its position in urls).
+
+    With workers > 1 (or 'selenium_workers' in config), each worker owns its own
+    browser and pulls URLs from a shared queue. Pass a UrlFeed instead of urls to keep
+    adding URLs while the workers run; they stop once it is closed and empty.
+    """
+    if feed is None:
+        if not urls:
+            return
+        feed = _prefilled_feed(urls, indices)
+    config = _load_config()
+    pool = get_browser_pool(config)
+    profile = "text-only" if pool.text_only else "full"
+    extraction = config.get("selenium_extraction_mode", "page_source")
+    if extraction not in EXTRACTION_MODES:
+        print(f"⚠ Unknown selenium_extraction_mode '{extraction}'. Using page_source.")
+        extraction = "page_source"
+    cache = get_page_cache(config) if use_cache else None
+
+    if workers is None:
+        workers = config.get("selenium_workers", 1)
+    total_urls = feed.total
+    workers = max(1, min(int(workers or 1), total_urls))
+
+    get_host_limiter(config)
+    done_queue = queue.Queue()
+
+    def worker():
+        # Drivers come warm from the process-wide pool (only once a page actually needs one)
+        driver, acquired, pages = None, False, 0
+
+        try:
+            while True:
+                item = feed.get()
+                if item is None:
+                    break
+                url, index = item
+
+                label = f"[{index + 1}/{total_urls}]"
+                formatted_text, page_title, engine = None, "Untitled Page", None
+                started = time.time()
+                try:
+                    cached_html = _cached_rendered_page(cache, url) if cache else None
+                    if cached_html:
+                        formatted_text, page_title = html_to_markdown(cached_html)
+                        print(f"{label} ✓ Loaded {url} from page cache")
+                        if not formatted_text or len(formatted_text.strip()) <= 50:
+                            formatted_text = None
+                        else:
+                            engine = "cache"
+
+                    if not formatted_text and not acquired:
+                        driver, acquired = pool.acquire(config), True
+                        if not driver:
+                            print("⚠ All browsers failed to initialize. Falling back to Requests engine.")
+
+                    if not formatted_text and driver:
+                        readiness = get_readiness_settings(url, config)
+                        formatted_text, page_title = _scrape_url_with_driver(driver, url, label, cache, readiness, profile, extraction)
+                        engine = "selenium" if formatted_text else None
+                        pages += 1
+                        if not formatted_text and not is_driver_healthy(driver):
+                            print("  ⚠ Browser session crashed. Recycling it.")
+                            pool.release(driver, pages, broken=True)
+                            driver, pages = pool.acquire(config), 0
+                        elif pool.needs_recycle(driver, pages):
+                            pool.release(driver, pages)
+                            driver, pages = pool.acquire(config), 0
+
+                    # Fallback to requests if Selenium didn't work or content was blocked
+                    if not formatted_text and use_requests_fallback:
+                        print(f"  → Attempting Requests-based extraction for {url}...")
+                        content, req_title, success = scrape_with_requests(url, use_cache=use_cache)
+                        if success and content:
+                            formatted_text, page_title, engine = content, req_title, "requests"
+                            print(f"  ✓ Requests extraction successful ({url})")
+                except Exception as e:
+                    # Only a per-engine note: the caller reports the URL's final outcome
+                    print(f"  ⚠ Selenium could not scrape {url}: {e}")
+                    done_queue.put(_page_result(url, index, error=str(e), elapsed=time.time() - started))
+                    continue
+
+                if formatted_text:
+                    print(f"✓ Scraped: {url}")
+                    done_queue.put(_page_result(url, index, page_title, formatted_text, engine, time.time() - started))
+                else:
+                    print(f"  ⚠ Selenium found no readable content at {url}")
+                    done_queue.put(_page_result(url, index, page_title, None, None,
+                                                time.time() - started, "No readable content extracted"))
+        finally:
+            pool.release(driver, pages)
+            done_queue.put(None)
+
+    if workers > 1:
+        print(f"Scraping with {workers} parallel browser workers...")
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    running = workers
+    while running:
+        page = done_queue.get()
+        if page is None:
+            running -= 1
+        else:
+            yield page
+    for t in threads:
+        t.join()
+
+
 def save_to_file(text, filename="scraped_content.txt"):
     """Saves text safely to a file."""
     if not text.strip():
@@ -514,72 +1020,107 @@ def save_to_file(text, filename="scraped_content.txt"):
         print(f"✗ Error saving file: {e}")
 
 
+def scrape_with_crawl4ai(urls, headless=True):
+    pages = crawl_pages_with_crawl4ai(urls, headless=headless)
+    if pages is None:
+        return None
+
+    all_text = ""
+    for url, page in zip(urls, pages):
+        if page:
+            all_text += f"\n--- Content from {url} ---\n"
+            all_text += page[1]
+    return all_text
+
+
+def crawl_pages_with_crawl4ai(urls, headless=True, concurrency=None):
+    """
+    Returns one (page_title, markdown) tuple per URL (None where crawling failed),
+    or None when crawl4ai is not installed.
+    """
+    if get_crawl4ai_service() is None:
+        print("crawl4ai is not installed, falling back to legacy scraper.")
+        return None
+    return collect_page_results(iter_crawl4ai(urls, headless, concurrency), len(urls))
+
+
+def iter_crawl4ai(urls, headless=True, concurrency=None, indices=None, feed=None):
+    """
+    Yields a result dict (see iter_scrape) per URL as each page finishes.
+
+    Pages go to the long-lived crawl4ai service, which keeps its browser warm
+    between calls. Up to `concurrency` pages (or 'crawl4ai_concurrency' in config)
+    are crawled at once. Pass a UrlFeed instead of urls to keep adding URLs while
+    pages are being crawled.
+    """
+    if feed is not None:
+        yield from _iter_crawl4ai_feed(feed, headless, concurrency)
+        return
+    if not urls:
+        return
+    indices = indices or list(range(len(urls)))
+    service = get_crawl4ai_service()
+    if service is None:
+        for position, url in enumerate(urls):
+            yield _page_result(url, indices[position], error="crawl4ai is not installed")
+        return
+
+    if concurrency is None:
+        concurrency = _load_config().get("crawl4ai_concurrency", 3)
+    concurrency = max(1, min(int(concurrency or 1), len(urls)))
+
+    futures = service.submit_pages(urls, headless=headless, concurrency=concurrency)
+    positions = {future: position for position, future in enumerate(futures)}
+    for future in as_completed(futures):
+        position = positions[future]
+        try:
+            page, elapsed = future.result()
+            error = None if page else "crawl failed"
+        except Exception as e:
+            print(f"Error crawling with crawl4ai: {e}")
+            page, elapsed, error = None, 0.0, str(e)
+        yield _page_result(urls[position], indices[position], page[0] if page else None,
+                           page[1] if page else None, "crawl4ai", elapsed, error)
+
+
+
+def _iter_crawl4ai_feed(feed, headless, concurrency):
+    service = get_crawl4ai_service()
+    if service is None:
+        for url, index in iter(feed.get, None):
+            yield _page_result(url, index, error="crawl4ai is not installed")
+        return
+
+    if concurrency is None:
+        concurrency = _load_config().get("crawl4ai_concurrency", 3)
+    concurrency = max(1, min(int(concurrency or 1), feed.total))
+
+    done_queue = queue.Queue()
+
+    def publish(url, index, page, elapsed):
+        done_queue.put(_page_result(url, index, page[0] if page else None, page[1] if page else None,
+                                    "crawl4ai", elapsed, None if page else "crawl failed"))
+
+    job = service.submit_feed(feed, publish, headless=headless, concurrency=concurrency)
+    job.add_done_callback(lambda _: done_queue.put(None))
+    published = set()
+    for page in iter(done_queue.get, None):
+        published.add(page["index"])
+        yield page
+    error = job.exception()
+    if error:
+        # e.g. the browser failed to start; URLs still in the feed are left to the caller
+        print(f"Error crawling with crawl4ai: {error}")
+        for url, index in feed.taken:
+            if index not in published:
+                yield _page_result(url, index, engine="crawl4ai", error=str(error))
+
+
 if __name__ == "__main__":
-    # Ensure BeautifulSoup is available for self-test
     urls_to_scrape = get_urls()
     if urls_to_scrape:
-        scraped_content = scrape_with_selenium(urls_to_scrape)
+        scraped_content = scrape_tiered(urls_to_scrape)
         if scraped_content.strip():
             save_to_file(scraped_content)
             print("\n--- Preview of Scraped Content ---")
             print(scraped_content[:1500] + "\n\n... [TRUNCATED] ...")
-
-import asyncio
-import os
-
-def scrape_with_crawl4ai(urls, headless=True):
-    try:
-        from crawl4ai import BrowserConfig, CrawlerRunConfig, AsyncWebCrawler, DefaultMarkdownGenerator
-    except ImportError:
-        print("crawl4ai is not installed, falling back to legacy scraper.")
-        return None
-
-    async def _crawl():
-        os.environ["NODE_OPTIONS"] = "--no-deprecation"
-        browser_config = BrowserConfig(
-            headless=headless,
-            verbose=False,
-            use_persistent_context=True,
-            user_data_dir="./.crawl4ai_profile",
-        )
-
-        wait_for_loading = """js:() => {
-            const text = document.body ? document.body.innerText : '';
-            return !text.includes('Loading page resources.') && !text.includes('The site isn\\'t loading');
-        }"""
-
-        config = CrawlerRunConfig(
-            wait_for=wait_for_loading,
-            delay_before_return_html=3.0,
-            css_selector="body",
-            excluded_selector=".toc, .wds-global-footer, #catlinks, .printfooter, .global-top-navigation, .notifications-placeholder, #community-navigation, .community-header-wrapper, .global-explore-navigation, .global-footer, .global-footer__content, .global-footer__bottom, .fandom-community-header, #navigator, #header, .full_hr, .menubar, #toolbar, #lastmodified, #footer, #cosmos-footer, #cosmos-toolbar, .cosmos-header, #cosmos-banner, .mw-header, #mw-head, #mw-panel, #mw-page-base, #mw-head-base, .mw-footer, .mw-footer-container, .vector-column-end, .vector-sticky-pinned-container, .azltable, .page__rioque ght-rail, #google_translate_element, #onetrust-banner-sdk, #onetrust-consent-sdk, #top_leaderboard-odyssey-wrapper, .mw-cookiewarning-container, .nv-view, .nv-talk, .nv-edit, .navibox, .pcomment, #google_translate_element, #goog-gt-tt, #goog-gt-vt, .adthrive-comscore, .adthrive-footer-message, .adthrive-ad, .adthrive-footer, .raptive-content-terms-modal, .adthrive-ccpa-modal, #adt-ii, #adthrive-mcmp",
-            markdown_generator=DefaultMarkdownGenerator(
-                options={"ignore_links": True, "skip_internal_links": True}
-            )
-        )
-
-        all_text = ""
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            for url in urls:
-                try:
-                    result = await crawler.arun(url=url, config=config)
-                    if result.success:
-                        all_text += f"\n--- Content from {url} ---\n"
-                        all_text += str(result.markdown)
-                    else:
-                        print(f"Failed to crawl {url}: {result.error_message}")
-                except Exception as e:
-                    print(f"Error crawling {url}: {e}")
-        return all_text
-
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running(): 
-            # When we run from Tkinter, it doesn't normally have an asyncio loop running,
-            # but if it does, returning coroutine and letting callers manage it would be correct.
-            # We'll just run in a new thread if needed.
-            pass
-    except RuntimeError:
-        pass
-        
-    return asyncio.run(_crawl())
\ No newline at end of file